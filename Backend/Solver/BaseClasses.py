@@ -1,13 +1,15 @@
 from dataclasses import dataclass, field
-from typing import Dict, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 
+import numpy as np
 
-@dataclass(order=True, frozen=True)
+
+@dataclass(order=True, frozen=True, slots=True)
 class Product:
     id: int = -1
     name: str = field(default="Unnamed", compare=False)
     weight: float = -1.0
-    aux_info: Dict[str, str] = field(default_factory=dict, compare=False)
+    _aux_info: Optional[Dict[str, str]] = field(default=None, init=False, compare=False, repr=False)
 
     def __eq__(self, other):
         return (
@@ -16,14 +18,26 @@ class Product:
             and self.weight == other.weight
         )
 
+    @property
+    def aux_info(self) -> Dict[str, str]:
+        # Created on first use, most products never get any
+        if self._aux_info is None:
+            object.__setattr__(self, "_aux_info", {})
+        return self._aux_info
+
 
-@dataclass(order=True, frozen=True)
+@dataclass(order=True, frozen=True, slots=True)
 class Transport:
     id: int = -1
     name: str = field(default="Unnamed", compare=False)
     fuel_cost: float = 1.0
     weight_lift: float = -1.0
-    aux_info: Dict[str, str] = field(default_factory=dict, compare=False)
+    # Vehicles of this type (-1 for any number), the distance each may drive and the trips each
+    # may make during a shift (inf for no limit)
+    count: int = field(default=-1, compare=False)
+    shift_limit: float = field(default=float("inf"), compare=False)
+    trip_limit: float = field(default=float("inf"), compare=False)
+    _aux_info: Optional[Dict[str, str]] = field(default=None, init=False, compare=False, repr=False)
 
     def __eq__(self, other):
         return (
@@ -32,14 +46,40 @@ class Transport:
             and self.weight_lift == other.weight_lift
         )
 
+    @property
+    def aux_info(self) -> Dict[str, str]:
+        if self._aux_info is None:
+            object.__setattr__(self, "_aux_info", {})
+        return self._aux_info
+
 
 class ProductStorage:
+    """Named location holding quantities of products.
+
+    Besides the product -> count dict, every product gets a position on insert: _quantities
+    holds the counts by position and _by_id maps a product id to the position of the first
+    product inserted with it, which makes id lookups O(1). Change counts through insert or
+    merge only, writes into stored_products would bypass both.
+    """
+    __slots__ = ("name", "id", "address", "_stored_products", "_products", "_positions", "_by_id",
+                 "_quantities", "_aux_info")
+
     def __init__(self, name="Unnamed", id=-1, address="No address"):
         self.name = name
         self.id = id
         self.address = address
         self._stored_products: Dict[Product, int] = {}
-        self.aux_info: Dict[str, str] = {}
+        self._products: List[Product] = []
+        self._positions: Dict[Product, int] = {}
+        self._by_id: Dict[int, int] = {}
+        self._quantities = np.zeros(4, dtype=np.int64)
+        self._aux_info: Optional[Dict[str, str]] = None
+
+    @property
+    def aux_info(self) -> Dict[str, str]:
+        if self._aux_info is None:
+            self._aux_info = {}
+        return self._aux_info
 
     def __lt__(self, other):
         return self.id < other.id
@@ -55,38 +95,52 @@ class ProductStorage:
         return hash((self.name, self.address))
 
     def __getitem__(self, product_id: int) -> Optional[Product]:
-        return next((p for p in self._stored_products if p.id == product_id), None)
+        return self.get_product_by_id(product_id)
     
     def __iter__(self):
         return iter(self.stored_products.items())
 
     def insert(self, product: Product, count: int):
+        position = self._positions.get(product)
+        if position is None:
+            position = self._positions[product] = len(self._products)
+            self._products.append(product)
+            self._by_id.setdefault(product.id, position)
+            if position == self._quantities.size:
+                self._quantities = np.concatenate([self._quantities, np.zeros_like(self._quantities)])
         self._stored_products[product] = count
+        self._quantities[position] = count
 
     def insert_raw(self, name: str, id: int, weight: float, count: int):
         self.insert(Product(name=name, id=id, weight=weight), count)
 
     def merge(self, other: "ProductStorage"):
         for product, count in other._stored_products.items():
-            self._stored_products[product] = max(
-                self._stored_products.get(product, 0), count
-            )
+            self.insert(product, max(self._stored_products.get(product, 0), count))
 
     def get_pair_by_id(self, product_id: int) -> Optional[Tuple[Product, int]]:
-        return next(
-            ((product, count) for product, count in self._stored_products.items()
-             if product.id == product_id),
-            None
-        )
+        position = self._by_id.get(product_id)
+        if position is None:
+            return None
+        product = self._products[position]
+        return product, self._stored_products[product]
 
     def get_product_by_id(self, product_id: int) -> Optional[Product]:
-        pair = self.get_pair_by_id(product_id)
-        return pair[0] if pair else None
+        position = self._by_id.get(product_id)
+        return None if position is None else self._products[position]
 
     def get_count_by_id(self, product_id: int) -> int:
         pair = self.get_pair_by_id(product_id)
         return pair[1] if pair else 0
 
+    def get_counts_by_ids(self, product_ids: Iterable[int]) -> np.ndarray:
+        """Counts of the given product ids as an int64 vector, 0 for products not stored here."""
+        by_id = self._by_id
+        positions = np.fromiter((by_id.get(i, -1) for i in product_ids), dtype=np.intp)
+        counts = self._quantities[positions]
+        counts[positions < 0] = 0
+        return counts
+
     @property
     def size(self) -> int:
         return len(self._stored_products)
@@ -94,3 +148,12 @@ class ProductStorage:
     @property
     def stored_products(self) -> Dict[Product, int]:
         return self._stored_products
+
+
+def quantity_matrix(storages: Iterable[ProductStorage], product_ids: Iterable[int]) -> np.ndarray:
+    """Storages x products matrix of counts, e.g. the supply or demand vectors of several products at once."""
+    product_ids = list(product_ids)
+    rows = [storage.get_counts_by_ids(product_ids) for storage in storages]
+    if not rows:
+        return np.zeros((0, len(product_ids)), dtype=np.int64)
+    return np.vstack(rows)
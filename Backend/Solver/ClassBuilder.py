@@ -1,48 +1,146 @@
-from typing import List, Dict
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Dict, Tuple
 from itertools import count
 from Backend.Solver.BaseClasses import *
 from Backend.Solver.RouteClasses import *
+from Backend.Solver.fleet import fleet_limits_from_json
 
 
-product_id_counter = count(start=1)
-product_registry: Dict[str, Product] = {}
+# Product ids are unique for the whole process, so products of different scopes never collide
+_product_ids = count(start=1)
+_product_ids_lock = threading.Lock()
+
+def next_product_id() -> int:
+    with _product_ids_lock:
+        return next(_product_ids)
+
+
+class ProductRegistry:
+    """Interning scope for products, one Product per name.
+
+    A scope lives for one request (see product_scope) or one tenant, so names and weights
+    never leak between them. With max_size set, at most that many names are kept; the least
+    recently used one is dropped first and gets a new Product if it comes back. A request scope
+    is unbounded: it dies with the request, and a dropped name would no longer match the
+    storages holding its old Product.
+
+    With reweigh set, a name that comes back with another weight gets a new Product, which
+    replaces the old one; otherwise the first weight seen for a name is kept.
+    """
+    def __init__(self, max_size: Optional[int] = None, reweigh: bool = False):
+        self.max_size = max_size
+        self.reweigh = reweigh
+        self._products: "OrderedDict[str, Product]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, name: str, weight: str, weight_coef = 1.0) -> Product:
+        weight = float(weight) * weight_coef
+        with self._lock:
+            product = self._products.get(name)
+            if product is None or (self.reweigh and product.weight != weight):
+                product = self._products[name] = Product(
+                    id=next_product_id(),
+                    name=name,
+                    weight=weight
+                )
+                self._products.move_to_end(name)
+                while self.max_size is not None and len(self._products) > self.max_size:
+                    self._products.popitem(last=False)
+            else:
+                self._products.move_to_end(name)
+            return product
+
+    def __len__(self):
+        return len(self._products)
+
+
+# Used outside of any product_scope, e.g. by scripts; it lives as long as the process, so it is bounded,
+# and a product whose weight changed between calls is not served with its old weight
+default_registry = ProductRegistry(int(os.getenv("LTM_PRODUCT_REGISTRY_SIZE", "4096")), reweigh=True)
+_current_registry: ContextVar[Optional[ProductRegistry]] = ContextVar("product_registry", default=None)
+
+def current_registry() -> ProductRegistry:
+    registry = _current_registry.get()
+    return registry if registry is not None else default_registry
+
+@contextmanager
+def product_scope(registry: Optional[ProductRegistry] = None) -> Iterator[ProductRegistry]:
+    """Makes registry (a fresh, unbounded one by default) the interning scope of the builders in this context."""
+    registry = registry if registry is not None else ProductRegistry()
+    token = _current_registry.set(registry)
+    try:
+        yield registry
+    finally:
+        _current_registry.reset(token)
 
 def build_RouteMatrix(storages, routes):
-    #print("-----building matrix------")
-    result = set()
     products = set()
     for storage in storages:
         for prod in storage:
-            if prod[0] not in products:
-                products.add(prod[0])
-    #print(products)
+            products.add(prod[0])
+
+    # One pass over the routes numbers their endpoints (by identity, RouteMatrix still merges
+    # equal storages) and keeps the route of every pair together with the position of the
+    # pair's first route, so that lines and columns keep their order of appearance
+    sources: List[ProductStorage] = []
+    targets: List[ProductStorage] = []
+    source_ids: Dict[int, int] = {}
+    target_ids: Dict[int, int] = {}
+    pair_routes: Dict[Tuple[int, int], Tuple[int, Route]] = {}
+    for position, route in enumerate(routes):
+        s = source_ids.get(id(route.storage_ptr))
+        if s is None:
+            s = source_ids[id(route.storage_ptr)] = len(sources)
+            sources.append(route.storage_ptr)
+        r = target_ids.get(id(route.receiver_ptr))
+        if r is None:
+            r = target_ids[id(route.receiver_ptr)] = len(targets)
+            targets.append(route.receiver_ptr)
+        first = pair_routes.get((s, r))
+        pair_routes[(s, r)] = (position if first is None else first[0], route)
+
+    # Inverted index: product -> storages holding it and receivers demanding it
+    holders: Dict[Product, List[int]] = {prod: [] for prod in products}
+    demanders: Dict[Product, List[int]] = {prod: [] for prod in products}
+    for nodes, index in ((sources, holders), (targets, demanders)):
+        for k, node in enumerate(nodes):
+            for prod in node.stored_products:
+                found = index.get(prod)
+                if found is not None:
+                    found.append(k)
+
+    result = set()
     for prod in products:
         routeMatrix = RouteMatrix(prod)
-        for route in routes:
-            #print(prod)
-            #print(route.storage_ptr.stored_products.keys())
-            #print(route.receiver_ptr.stored_products.keys())
-            if prod in route.storage_ptr.stored_products.keys() and prod in route.receiver_ptr.stored_products.keys():
-                routeMatrix.set_at(route.storage_ptr, route.receiver_ptr, route)
+        found = []
+        for s in holders[prod]:
+            for r in demanders[prod]:
+                entry = pair_routes.get((s, r))
+                if entry is not None:
+                    found.append(entry)
+        found.sort(key=lambda entry: entry[0])
+        for _, route in found:
+            routeMatrix.set_at(route.storage_ptr, route.receiver_ptr, route)
         result.add(routeMatrix)
     return result
 
-def get_or_create_product(name: str, weight: str, weight_coef = 1.0) -> Product:
-    if name not in product_registry:
-        product_registry[name] = Product(
-            id=next(product_id_counter),
-            name=name,
-            weight=float(weight) * weight_coef
-        )
-    return product_registry[name]
+def get_or_create_product(name: str, weight: str, weight_coef = 1.0, registry: Optional[ProductRegistry] = None) -> Product:
+    registry = registry if registry is not None else current_registry()
+    return registry.get_or_create(name, weight, weight_coef)
 
-def build_ProductStorage_from_json(warehouses_json: List[Dict], weight_coef = 1.0) -> List[ProductStorage]:
+def build_ProductStorage_from_json(warehouses_json: List[Dict], weight_coef = 1.0,
+                                   registry: Optional[ProductRegistry] = None) -> List[ProductStorage]:
+    registry = registry if registry is not None else current_registry()
     result = []
     for entry in warehouses_json:
         storage = ProductStorage(name=entry["name"], address=entry["address"])
         for cargo in entry.get("cargos", []):
             #print(cargo)
-            product = get_or_create_product(cargo["type"], cargo["weight"], weight_coef)
+            product = registry.get_or_create(cargo["type"], cargo["weight"], weight_coef)
             quantity = int(cargo["quantity"])
             storage.insert(product, quantity)
         result.append(storage)
@@ -58,6 +156,8 @@ def build_Route_from_json(
     route_id_counter = count(start=1)
     storage_lookup = {(s.name, s.address): s for s in all_storages}
     route_objects = []
+    # Payloads of the kept routes, in id order; routes refer to it instead of holding their dict
+    payloads = []
 
     for route in routes_json:
         from_key = (route["from"], route["from_address"])
@@ -74,13 +174,14 @@ def build_Route_from_json(
         route_obj.length = int(route.get("distance_m", -1)) * distance_coef
         route_obj.storage_ptr = storage
         route_obj.receiver_ptr = receiver
-        route_obj.raw_data = route
+        route_obj.payloads = payloads
 
+        payloads.append(route)
         route_objects.append(route_obj)
 
     return route_objects
 
-def build_Transport_from_json(transport_json: List[Dict], weight_lift_coef = 1.0, fuel_cost_coef = 1.0) -> List[Transport]:
+def build_Transport_from_json(transport_json: List[Dict], weight_lift_coef = 1.0, fuel_cost_coef = 1.0, distance_coef = 1) -> List[Transport]:
     transport_objects = []
     id_counter = count(start=1)
     for transport in transport_json:
@@ -91,11 +192,14 @@ def build_Transport_from_json(transport_json: List[Dict], weight_lift_coef = 1.0
             fc = float(transport.get("fuel", "1")) * fuel_cost_coef
         except:
             pass
+        vehicles, shift, trips = fleet_limits_from_json(transport, distance_coef)
         transport_objects.append(Transport(
             id = next(id_counter),
             name = transport.get("name", "unnamed"),
             fuel_cost = fc,
-            weight_lift = wl
-            
+            weight_lift = wl,
+            count = vehicles,
+            shift_limit = shift,
+            trip_limit = trips
         ))
     return transport_objects
\ No newline at end of file
@@ -1,9 +1,16 @@
 from Backend.Solver.ClassBuilder import build_RouteMatrix
+from Backend.Solver.RouteClasses import DistanceMatrix
 from Backend.Solver.calculation import Calculation, assign_transport_from_calculation, List, solve_array_RouteMatrix
+from Backend.Solver.calculation import InstanceCalculation, assign_transport_from_instance, solve_instance
+from Backend.Solver.calculation import pack_transport_from_calculations, pack_transport_from_instance
+from Backend.Solver.calculation import assign_transport_by_lane, assign_transport_by_lane_from_instance
+from Backend.Solver.instance import ProblemInstance
+from Backend.Solver.fleet import FleetFrontier, fleet_is_limited
 
-def transport_assigned_formatter(solution : Calculation, transports):
+def transport_assigned_formatter(solution : Calculation, transports, fleet = None, transport_routes = None):
     formatted_output = {}
-    transport_routes = assign_transport_from_calculation(solution, transports)
+    if transport_routes == None:
+        transport_routes = assign_transport_from_calculation(solution, transports, fleet)
     for transport in transport_routes:
         for route in transport_routes[transport]:
             route_data = route.raw_data
@@ -32,21 +39,90 @@ def statistics_formatter(solution : Calculation, additional_costs = 0):
         destinations.add(pair[1])
     formatted_output["warehouses_count"] = len(warehouses)
     formatted_output["destinations_count"] = len(destinations)
+    formatted_output["unassigned_weight"] = solution.unassigned_weight
+    formatted_output["undelivered_weight"] = solution.undelivered_weight
     return formatted_output
 
-def double_formatter(solution : Calculation, transports, additional_costs = 0):
-    transports_formatted = transport_assigned_formatter(solution, transports)
+def double_formatter(solution : Calculation, transports, additional_costs = 0, fleet = None, transport_routes = None):
+    transports_formatted = transport_assigned_formatter(solution, transports, fleet, transport_routes)
     statistics = statistics_formatter(solution, additional_costs)
     statistics["truck_count"] = len(transports_formatted)
     return (statistics, transports_formatted)
 
-def array_double_formatter(solutions : List[Calculation], transports, additional_costs = 0):
+def array_double_formatter(solutions : List[Calculation], transports, additional_costs = 0, consolidate = False):
+    """Without consolidate every product's routes get their own vehicle choice, as before. With it the
+    products sharing a warehouse -> receiver lane get one vehicle choice for their summed weight and
+    each pays its weight's share of the lane cost. Both price their vehicles with charge_entries, so
+    a single product on a lane costs the same either way. A limited fleet is shared by all products, so
+    their lanes are always packed together."""
     result = []
+    if fleet_is_limited([t.count for t in transports], [t.shift_limit for t in transports]):
+        packed = pack_transport_from_calculations(solutions, transports)
+        for solution, transport_routes in zip(solutions, packed):
+            result.append(double_formatter(solution, transports, additional_costs, transport_routes=transport_routes))
+        return result
+    fleet = FleetFrontier.from_transports(transports)
+    if consolidate:
+        by_lane = assign_transport_by_lane(solutions, transports, fleet)
+        for solution, transport_routes in zip(solutions, by_lane):
+            result.append(double_formatter(solution, transports, additional_costs, transport_routes=transport_routes))
+        return result
     for solution in solutions:
-        result.append(double_formatter(solution, transports, additional_costs))
+        result.append(double_formatter(solution, transports, additional_costs, fleet))
     return result
 
-def array_simple_formatter(storages, routes, transports, additional_costs = 0, cost_per_distance = 0.0):
+def array_simple_formatter(storages, routes, transports, additional_costs = 0, cost_per_distance = 0.0, engine = None, mode = None, consolidate = False):
     routeMatrices = build_RouteMatrix(storages, routes)
-    calculations = solve_array_RouteMatrix(routeMatrices, cost_per_distance)
-    return array_double_formatter(calculations, transports, additional_costs)
\ No newline at end of file
+    distances = DistanceMatrix.from_routes(routes)
+    calculations = solve_array_RouteMatrix(routeMatrices, cost_per_distance, engine, mode, distances)
+    return array_double_formatter(calculations, transports, additional_costs, consolidate)
+
+
+def instance_transport_formatter(instance : ProblemInstance, solution : InstanceCalculation, assignment = None):
+    """assignment is a list of (vehicle name, instance route indices), by default the unlimited fleet's choice."""
+    formatted_output = {}
+    if assignment is None:
+        transport_routes = assign_transport_from_instance(instance, solution)
+        assignment = [(instance.transport_names[transport], routes) for transport, routes in transport_routes.items()]
+    for name, routes in assignment:
+        entry = formatted_output.setdefault(name, {})
+        for route in routes:
+            route_data = instance.route_payloads[route]
+            entry.setdefault("routes", {})[(route_data["from"], route_data["to"])] = route_data
+            entry.setdefault("warehouses", {})[route_data["from"]] = {route_data["from_address"]}
+            entry.setdefault("destinations", {})[route_data["to"]] = {route_data["to_address"]}
+    return formatted_output
+
+def instance_statistics_formatter(instance : ProblemInstance, solution : InstanceCalculation, additional_costs = 0):
+    return {
+        "length" : solution.distance_overall,
+        "cost" : solution.cost_overall + additional_costs,
+        "warehouses_count" : len(set(instance.route_from[solution.routes].tolist())),
+        "destinations_count" : len(set(instance.route_to[solution.routes].tolist())),
+        "unassigned_weight" : solution.unassigned_weight,
+        "undelivered_weight" : solution.undelivered_weight,
+    }
+
+def instance_double_formatter(instance : ProblemInstance, solution : InstanceCalculation, additional_costs = 0, assignment = None):
+    transports_formatted = instance_transport_formatter(instance, solution, assignment)
+    statistics = instance_statistics_formatter(instance, solution, additional_costs)
+    statistics["truck_count"] = len(transports_formatted)
+    return (statistics, transports_formatted)
+
+def instance_simple_formatter(instance : ProblemInstance, additional_costs = 0, cost_per_distance = 0.0, engine = None, mode = None, consolidate = False):
+    """Same output as array_simple_formatter, computed on the columnar instance."""
+    calculations = solve_instance(instance, cost_per_distance, engine, mode)
+    if instance.fleet_limited:
+        packed, names = pack_transport_from_instance(instance, calculations)
+        return [
+            instance_double_formatter(instance, solution, additional_costs, [(names[unit], routes) for unit, routes in units.items()])
+            for solution, units in zip(calculations, packed)
+        ]
+    if consolidate:
+        by_lane = assign_transport_by_lane_from_instance(instance, calculations)
+        return [
+            instance_double_formatter(instance, solution, additional_costs,
+                                      [(instance.transport_names[transport], routes) for transport, routes in transports.items()])
+            for solution, transports in zip(calculations, by_lane)
+        ]
+    return [instance_double_formatter(instance, solution, additional_costs) for solution in calculations]
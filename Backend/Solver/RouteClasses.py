@@ -1,15 +1,28 @@
 from dataclasses import dataclass, field
-from typing import Dict, Tuple, Optional
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Tuple, Optional
+import numpy as np
 from Backend.Solver.BaseClasses import ProductStorage, Product
 
 
-@dataclass
+@dataclass(slots=True)
 class Route:
+    """Route between two storages.
+
+    The raw JSON payload is not kept on the route: payloads is the request's table of route
+    payloads, ordered by route id, so raw_data is payloads[id - 1].
+    """
     id: int = -1
     length: int = -1
     storage_ptr: Optional[ProductStorage] = None
     receiver_ptr: Optional[ProductStorage] = None
-    raw_data: Dict[str, str] = field(default_factory=dict)
+    payloads: Optional[List[Dict]] = field(default=None, repr=False)
+
+    @property
+    def raw_data(self) -> Dict:
+        if self.payloads is None or self.id < 1:
+            return {}
+        return self.payloads[self.id - 1]
 
     def __lt__(self, other: 'Route') -> bool:
         return self.id < other.id
@@ -36,37 +49,94 @@ class Route:
 
 
 class RouteMatrix:
+    """Routes of one product between its storages (lines) and receivers (columns).
+
+    Storages and receivers get integer indices on insert; route_ids holds the position of
+    each cell's route in route_list (-1 for none) and lengths its length (-1 for none).
+    """
+    _initial_capacity = 8
+
     def __init__(self, product : Product):
         self.storages: list[ProductStorage] = []
         self.receivers: list[ProductStorage] = []
-        self.routes: Dict[Tuple[ProductStorage, ProductStorage], Route] = {}
+        self.storage_index: Dict[ProductStorage, int] = {}
+        self.receiver_index: Dict[ProductStorage, int] = {}
+        self.route_list: list[Route] = []
+        self._route_ids = np.full((self._initial_capacity, self._initial_capacity), -1, dtype=np.int32)
+        self._lengths = np.full((self._initial_capacity, self._initial_capacity), -1, dtype=np.int32)
         self.aux_info: Dict[str, str] = {}
         self.product: Product = product
 
-    def add_storage(self, storage: ProductStorage):
-        if storage not in self.storages:
+    def _reserve(self, lines: int, columns: int):
+        capacity_lines, capacity_columns = self._route_ids.shape
+        if lines <= capacity_lines and columns <= capacity_columns:
+            return
+        shape = (
+            capacity_lines if lines <= capacity_lines else max(lines, 2 * capacity_lines),
+            capacity_columns if columns <= capacity_columns else max(columns, 2 * capacity_columns),
+        )
+        for name in ("_route_ids", "_lengths"):
+            old = getattr(self, name)
+            grown = np.full(shape, -1, dtype=np.int32)
+            grown[:capacity_lines, :capacity_columns] = old
+            setattr(self, name, grown)
+
+    def add_storage(self, storage: ProductStorage) -> int:
+        index = self.storage_index.get(storage)
+        if index is None:
+            index = self.storage_index[storage] = len(self.storages)
             self.storages.append(storage)
+            self._reserve(len(self.storages), len(self.receivers))
+        return index
 
-    def add_receiver(self, receiver: ProductStorage):
-        if receiver not in self.receivers:
+    def add_receiver(self, receiver: ProductStorage) -> int:
+        index = self.receiver_index.get(receiver)
+        if index is None:
+            index = self.receiver_index[receiver] = len(self.receivers)
             self.receivers.append(receiver)
+            self._reserve(len(self.storages), len(self.receivers))
+        return index
 
     def set_at(self, storage: ProductStorage, receiver: ProductStorage, route: Route):
-        self.add_storage(storage)
-        self.add_receiver(receiver)
-        self.routes[(storage, receiver)] = route
+        i = self.add_storage(storage)
+        j = self.add_receiver(receiver)
+        route_id = self._route_ids[i, j]
+        if route_id < 0:
+            route_id = len(self.route_list)
+            self.route_list.append(route)
+        else:
+            self.route_list[route_id] = route
+        self._route_ids[i, j] = route_id
+        self._lengths[i, j] = route.length
 
     def get_at(self, storage: ProductStorage, receiver: ProductStorage) -> Route:
-        return self.routes.get((storage, receiver), Route())
+        i = self.storage_index.get(storage)
+        j = self.receiver_index.get(receiver)
+        if i is None or j is None:
+            return Route()
+        return self._route(self._route_ids[i, j])
 
     def get_by_indices(self, storage_index: int, receiver_index: int) -> Route:
         try:
-            storage = self.storages[storage_index]
-            receiver = self.receivers[receiver_index]
-            return self.get_at(storage, receiver)
+            return self._route(self.route_ids[storage_index, receiver_index])
         except IndexError:
             return Route()
 
+    def _route(self, route_id) -> Route:
+        return self.route_list[route_id] if route_id >= 0 else Route()
+
+    @property
+    def route_ids(self) -> np.ndarray:
+        return self._route_ids[:self.lines, :self.columns]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self._lengths[:self.lines, :self.columns]
+
+    @property
+    def routes(self) -> "RouteView":
+        return RouteView(self)
+
     @property
     def lines(self) -> int:
         return len(self.storages)
@@ -80,3 +150,96 @@ class RouteMatrix:
 
     def get_receiver_vector(self) -> list[ProductStorage]:
         return self.receivers
+
+
+class RouteView(Mapping):
+    """Read-only (storage, receiver) -> Route mapping over a RouteMatrix."""
+    def __init__(self, matrix: RouteMatrix):
+        self._matrix = matrix
+
+    def __getitem__(self, key: Tuple[ProductStorage, ProductStorage]) -> Route:
+        matrix = self._matrix
+        i = matrix.storage_index.get(key[0])
+        j = matrix.receiver_index.get(key[1])
+        if i is None or j is None or matrix.route_ids[i, j] < 0:
+            raise KeyError(key)
+        return matrix.route_list[matrix.route_ids[i, j]]
+
+    def __iter__(self):
+        matrix = self._matrix
+        route_ids = matrix.route_ids
+        lines, columns = np.nonzero(route_ids >= 0)
+        order = np.argsort(route_ids[lines, columns])
+        for i, j in zip(lines[order].tolist(), columns[order].tolist()):
+            yield matrix.storages[i], matrix.receivers[j]
+
+    def __len__(self) -> int:
+        return len(self._matrix.route_list)
+
+    def values(self):
+        return list(self._matrix.route_list)
+
+
+# Prices of pairs without a route stay in the int32 range of the native engine
+NO_ROUTE_COST_LIMIT = 2 ** 30
+
+def prohibit_missing_routes(cost: np.ndarray, routed: np.ndarray) -> np.ndarray:
+    """cost with every pair that has no route priced so that an optimal plan ships nothing on it
+    while a plan over the routed pairs exists.
+
+    Flow leaves such a pair along a cycle through at most min(rows, columns) + 1 other pairs
+    (counting the balancing row or column of zero cost), so a price above that many times the
+    spread of route lengths always makes the cycle pay off.
+    """
+    if routed.all():
+        return cost
+    lengths = cost[routed]
+    low = min(int(lengths.min()), 0) if lengths.size else 0
+    high = max(int(lengths.max()), 0) if lengths.size else 0
+    price = min(low + (min(cost.shape) + 1) * (high - low) + 1, NO_ROUTE_COST_LIMIT)
+    return np.where(routed, cost, price)
+
+
+class DistanceMatrix:
+    """Warehouse x receiver route lengths of one request, shared by all products.
+
+    Pairs without a route hold -1, the length of an empty Route(), and are False in routed.
+    """
+    def __init__(self, storages: list[ProductStorage], receivers: list[ProductStorage], lengths: np.ndarray,
+                 routed: Optional[np.ndarray] = None):
+        self.storages = storages
+        self.receivers = receivers
+        self.storage_index: Dict[ProductStorage, int] = {s: i for i, s in enumerate(storages)}
+        self.receiver_index: Dict[ProductStorage, int] = {r: j for j, r in enumerate(receivers)}
+        self.lengths = lengths
+        self.routed = routed if routed is not None else lengths >= 0
+
+    @classmethod
+    def from_routes(cls, routes: Iterable[Route]) -> "DistanceMatrix":
+        routes = list(routes)
+        storage_index: Dict[ProductStorage, int] = {}
+        receiver_index: Dict[ProductStorage, int] = {}
+        rows = np.empty(len(routes), dtype=np.intp)
+        cols = np.empty(len(routes), dtype=np.intp)
+        lengths = np.empty(len(routes), dtype=np.int64)
+        for k, route in enumerate(routes):
+            rows[k] = storage_index.setdefault(route.storage_ptr, len(storage_index))
+            cols[k] = receiver_index.setdefault(route.receiver_ptr, len(receiver_index))
+            lengths[k] = route.length
+
+        matrix = np.full((len(storage_index), len(receiver_index)), -1, dtype=np.int64)
+        routed = np.zeros(matrix.shape, dtype=bool)
+        # With duplicate pairs the last route wins, as in RouteMatrix.set_at
+        matrix[rows, cols] = lengths
+        routed[rows, cols] = True
+        return cls(list(storage_index), list(receiver_index), matrix, routed)
+
+    def indices(self, routeMatrix: RouteMatrix) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.fromiter((self.storage_index[s] for s in routeMatrix.storages), dtype=np.intp, count=routeMatrix.lines)
+        cols = np.fromiter((self.receiver_index[r] for r in routeMatrix.receivers), dtype=np.intp, count=routeMatrix.columns)
+        return rows, cols
+
+    def cost_for(self, routeMatrix: RouteMatrix) -> np.ndarray:
+        """Cost matrix of one product; pairs without a route get a prohibitive price, see prohibit_missing_routes."""
+        cells = np.ix_(*self.indices(routeMatrix))
+        return prohibit_missing_routes(self.lengths[cells], self.routed[cells])
@@ -1,29 +1,68 @@
 import ctypes
 import os
+import threading
 import numpy as np
-from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
 
-from Backend.Solver.RouteClasses import Route, RouteMatrix
-from Backend.Solver.BaseClasses import Transport
+from Backend.Solver.RouteClasses import DistanceMatrix, Route, RouteMatrix
+from Backend.Solver.instance import ProblemInstance
+from Backend.Solver.fleet import FleetFrontier, FleetPacker
+from Backend.Solver.lanes import Lanes
+from Backend.Solver.BaseClasses import Transport, quantity_matrix
+from Backend.Solver import numpy_solver, network_simplex
+from Backend.Solver.plan_cache import PlanCache
+from Backend.Solver.warm_start import BasisStore
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
-lib_path = os.path.join(current_dir, "libsolver32.dll")
+lib_path = os.getenv("LTM_SOLVER_LIB", os.path.join(current_dir, "libsolver32.dll"))
 
-try:
-    lib = ctypes.CDLL(lib_path)
-except Exception as e:
-    raise RuntimeError(f"Failed to load library: {lib_path}. Error: {str(e)}")
+_lib = None
+_lib_error: Optional[Exception] = None
 
-lib.solveTransport.argtypes = [
-    ctypes.POINTER(ctypes.c_int), ctypes.c_int,
-    ctypes.POINTER(ctypes.c_int), ctypes.c_int,
-    ctypes.POINTER(ctypes.c_int), ctypes.c_int, ctypes.c_int
-]
-lib.solveTransport.restype = ctypes.POINTER(ctypes.c_int)
+def load_native_library():
+    global _lib, _lib_error
+    if _lib is not None or _lib_error is not None:
+        return _lib
+    try:
+        lib = ctypes.CDLL(lib_path)
+    except OSError as e:
+        _lib_error = e
+        return None
 
-lib.FreeResult.argtypes = [ctypes.POINTER(ctypes.c_int)]
-lib.FreeResult.restype = None
+    lib.solveTransport.argtypes = [
+        ctypes.POINTER(ctypes.c_int), ctypes.c_int,
+        ctypes.POINTER(ctypes.c_int), ctypes.c_int,
+        ctypes.POINTER(ctypes.c_int), ctypes.c_int, ctypes.c_int
+    ]
+    lib.solveTransport.restype = ctypes.POINTER(ctypes.c_int)
+
+    lib.FreeResult.argtypes = [ctypes.POINTER(ctypes.c_int)]
+    lib.FreeResult.restype = None
+
+    # Older builds of the library do not export the buffer and batch entry points
+    for name, ctype in (("solveTransportInto", ctypes.c_int), ("solveTransportInto64", ctypes.c_longlong)):
+        if hasattr(lib, name):
+            func = getattr(lib, name)
+            func.argtypes = [
+                ctypes.POINTER(ctype), ctypes.c_int,
+                ctypes.POINTER(ctype), ctypes.c_int,
+                ctypes.POINTER(ctype), ctypes.c_int, ctypes.c_int,
+                ctypes.POINTER(ctype)
+            ]
+            func.restype = None
+
+    if hasattr(lib, "solveTransportBatch"):
+        lib.solveTransportBatch.argtypes = [
+            ctypes.POINTER(ctypes.c_int), ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int), ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int), ctypes.c_int
+        ]
+        lib.solveTransportBatch.restype = None
+
+    _lib = lib
+    return _lib
 
 @dataclass
 class Calculation:
@@ -35,6 +74,8 @@ class Calculation:
     cost_per_distance: float = 1.0
     cost_overall: float = 0.0
     aux_costs: Dict[str, float] = field(default_factory=dict)
+    unassigned_weight: float = 0.0
+    undelivered_weight: float = 0.0
 
     @classmethod
     def from_data(cls, routeMatrix, solvedMatrix, cost_per_distance: float):
@@ -58,42 +99,83 @@ class Calculation:
             for receiver_ind in range(len(self.solvedMatrix[0])):
                 if (self.solvedMatrix[storage_ind][receiver_ind] > 0):
                     route = self.routeMatrix.get_by_indices(storage_ind, receiver_ind)
+                    weight = self.solvedMatrix[storage_ind][receiver_ind] * self.routeMatrix.product.weight
+                    # Only a demand no route can serve ends up on a pair without a route
+                    if route.storage_ptr is None:
+                        self.undelivered_weight += float(weight)
+                        continue
                     self.distance_overall += route.length
-                    self.route_values[route] = self.solvedMatrix[storage_ind][receiver_ind] * self.routeMatrix.product.weight
+                    self.route_values[route] = weight
 
-def solve_array_RouteMatrix(routeMatrices: List[RouteMatrix], cost_per_distance):
+def solve_array_RouteMatrix(routeMatrices: List[RouteMatrix], cost_per_distance, engine: Optional[str] = None,
+                            mode: Optional[str] = None, distances: Optional[DistanceMatrix] = None):
+    routeMatrices = list(routeMatrices)
+    if distances is None:
+        distances = DistanceMatrix.from_routes(route for matrix in routeMatrices for route in matrix.routes.values())
+    problems = [problem_from_RouteMatrix(matrix, distances) for matrix in routeMatrices]
+    keys = [matrix.product.name for matrix in routeMatrices]
+    plans = solve_batch(problems, engine, mode, keys=keys)
     calculations = []
-    for matrix in routeMatrices:
-        solution = Calculation.from_data(matrix, solve_from_RouteMatrix(matrix), cost_per_distance)
+    for matrix, plan in zip(routeMatrices, plans):
+        solution = Calculation.from_data(matrix, plan, cost_per_distance)
         calculations.append(solution)
     return calculations
 
-def solve_from_RouteMatrix(routeMatrix: RouteMatrix):
-    lines = routeMatrix.lines
-    columns = routeMatrix.columns
-    supply = [0] * lines
-    demand = [0] * columns
-    product = routeMatrix.product
-    cost = []
-    for line in range(lines):
-        cost.append([0]*columns)
-        for column in range(columns):
-            route = routeMatrix.get_by_indices(line, column)
-            storage = routeMatrix.storages[line].stored_products
-            receiver = routeMatrix.receivers[column].stored_products
-            supply[line] = storage[product] if supply[line] == 0 else supply[line]
-            demand[column] = receiver[product] if demand[column] == 0 else demand[column]
-            cost[line][column] = route.length
-    #print("----- Before the solve ------")
-    #print(f"supply length: {len(supply)}")
-    #print(f"supply: {supply}")
-    #print(f"demand length: {len(demand)}")
-    #print(f"demand: {demand}")
-    #print(f"cost: {cost}")
-    return solve(supply, demand, cost)
-
-
-def solve(supply, demand, cost):
+def problem_from_RouteMatrix(routeMatrix: RouteMatrix, distances: Optional[DistanceMatrix] = None):
+    """Supply, demand and cost of one product; the cost is sliced out of the request's distance matrix."""
+    if distances is None:
+        distances = DistanceMatrix.from_routes(routeMatrix.routes.values())
+    product_ids = [routeMatrix.product.id]
+    supply = quantity_matrix(routeMatrix.storages, product_ids)[:, 0]
+    demand = quantity_matrix(routeMatrix.receivers, product_ids)[:, 0]
+    return supply, demand, distances.cost_for(routeMatrix)
+
+def solve_from_RouteMatrix(routeMatrix: RouteMatrix, engine: Optional[str] = None):
+    return solve(*problem_from_RouteMatrix(routeMatrix), engine)
+
+
+def native_solve(supply, demand, cost, out: Optional[np.ndarray] = None):
+    lib = load_native_library()
+    if lib is None:
+        raise RuntimeError(f"Failed to load library: {lib_path}. Error: {str(_lib_error)}")
+    if not hasattr(lib, "solveTransportInto"):
+        result = _native_solve_copy(lib, supply, demand, cost)
+        if out is None:
+            return result
+        out[...] = result
+        return out
+
+    sl = len(supply)
+    dl = len(demand)
+
+    # Arrays that already have the right layout are handed to the library as they are
+    wide = hasattr(lib, "solveTransportInto64") and (
+        out.dtype == np.int64 if out is not None else getattr(cost, "dtype", None) == np.int64
+    )
+    dtype, ctype, func = (
+        (np.int64, ctypes.c_longlong, lib.solveTransportInto64) if wide
+        else (np.intc, ctypes.c_int, lib.solveTransportInto)
+    )
+    supply_a = np.ascontiguousarray(supply, dtype=dtype)
+    demand_a = np.ascontiguousarray(demand, dtype=dtype)
+    cost_a = np.ascontiguousarray(cost, dtype=dtype)
+    if cost_a.size != sl * dl:
+        raise ValueError(f"cost must have {sl}x{dl} elements, got {cost_a.size}")
+
+    if out is None:
+        out = np.empty((sl, dl), dtype=dtype)
+    elif out.shape != (sl, dl) or out.dtype != dtype or not out.flags.c_contiguous:
+        raise ValueError(f"out must be a C-contiguous {np.dtype(dtype)} array of shape {(sl, dl)}")
+
+    ptr = ctypes.POINTER(ctype)
+    func(
+        supply_a.ctypes.data_as(ptr), sl, demand_a.ctypes.data_as(ptr), dl,
+        cost_a.ctypes.data_as(ptr), sl, dl,
+        out.ctypes.data_as(ptr)
+    )
+    return out
+
+def _native_solve_copy(lib, supply, demand, cost):
     sl = len(supply)
     dl = len(demand)
 
@@ -114,27 +196,445 @@ def solve(supply, demand, cost):
 
     return result.reshape((sl, dl))
 
+
+SolverEngine = Callable[..., np.ndarray]
+BatchSolverEngine = Callable[[List[Tuple[List[int], List[int], List[List[int]]]]], List[np.ndarray]]
+WarmSolverEngine = Callable[..., Tuple[np.ndarray, Optional[np.ndarray]]]
+
+def pack_layout(problems) -> Tuple[np.ndarray, int, int]:
+    """Offsets table for packed problems: block start in data, rows, columns and plan start in the output buffer."""
+    offsets = np.zeros((len(problems), 4), dtype=np.intc)
+    data_size = 0
+    out_size = 0
+    for k, (supply, demand, cost) in enumerate(problems):
+        rows, cols = len(supply), len(demand)
+        offsets[k] = (data_size, rows, cols, out_size)
+        data_size += rows + cols + rows * cols
+        out_size += rows * cols
+    return offsets, data_size, out_size
+
+def pack_into(problems, offsets: np.ndarray, data: np.ndarray):
+    for (supply, demand, cost), (base, rows, cols, _) in zip(problems, offsets.tolist()):
+        data[base:base + rows] = supply
+        data[base + rows:base + rows + cols] = demand
+        data[base + rows + cols:base + rows + cols + rows * cols] = np.asarray(cost, dtype=np.intc).reshape(-1)
+
+def pack_problems(problems):
+    """Packs (supply, demand, cost) triples into one int buffer, see pack_layout for the offsets table."""
+    offsets, data_size, out_size = pack_layout(problems)
+    data = np.empty(data_size, dtype=np.intc)
+    pack_into(problems, offsets, data)
+    return data, offsets, out_size
+
+def unpack_plans(out: np.ndarray, offsets: np.ndarray) -> List[np.ndarray]:
+    return [out[base:base + rows * cols].reshape(rows, cols) for _, rows, cols, base in offsets.tolist()]
+
+def native_solve_batch(problems) -> List[np.ndarray]:
+    lib = load_native_library()
+    if lib is None:
+        raise RuntimeError(f"Failed to load library: {lib_path}. Error: {str(_lib_error)}")
+    if not hasattr(lib, "solveTransportBatch"):
+        return generic_solve_batch(native_solve, problems)
+
+    data, offsets, out_size = pack_problems(problems)
+    out = np.zeros(out_size, dtype=np.intc)
+    int_ptr = ctypes.POINTER(ctypes.c_int)
+    lib.solveTransportBatch(
+        data.ctypes.data_as(int_ptr), data.size,
+        offsets.ctypes.data_as(int_ptr), len(problems),
+        out.ctypes.data_as(int_ptr), out.size
+    )
+    return unpack_plans(out, offsets)
+
+def allocate_plans(problems) -> List[np.ndarray]:
+    offsets, _, out_size = pack_layout(problems)
+    return unpack_plans(np.zeros(out_size, dtype=np.intc), offsets)
+
+def _per_problem(engine: Union[SolverEngine, Sequence[SolverEngine]], count: int) -> Sequence[SolverEngine]:
+    return engine if isinstance(engine, (list, tuple)) else [engine] * count
+
+def generic_solve_batch(engine: Union[SolverEngine, Sequence[SolverEngine]], problems) -> List[np.ndarray]:
+    plans = allocate_plans(problems)
+    engines = _per_problem(engine, len(problems))
+    for solver, plan, (supply, demand, cost) in zip(engines, plans, problems):
+        if plan.size:
+            solver(supply, demand, cost, out=plan)
+    return plans
+
+solver_threads = int(os.getenv("LTM_SOLVER_THREADS", "0")) or (os.cpu_count() or 1)
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_thread_pool_lock = threading.Lock()
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    with _thread_pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=solver_threads, thread_name_prefix="solver")
+        return _thread_pool
+
+def set_solver_threads(count: int):
+    global solver_threads, _thread_pool
+    with _thread_pool_lock:
+        solver_threads = max(1, count)
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=True)
+            _thread_pool = None
+
+def threaded_solve_batch(engine: Union[SolverEngine, Sequence[SolverEngine]], problems) -> List[np.ndarray]:
+    # The native engine releases the GIL inside the library call, so products are solved concurrently.
+    # Every worker writes into its own view of the shared output buffer, which keeps the result order fixed.
+    plans = allocate_plans(problems)
+    engines = _per_problem(engine, len(problems))
+
+    def run(k):
+        supply, demand, cost = problems[k]
+        engines[k](supply, demand, cost, out=plans[k])
+
+    largest_first = sorted((k for k in range(len(plans)) if plans[k].size), key=lambda k: plans[k].size, reverse=True)
+    list(get_thread_pool().map(run, largest_first))
+    return plans
+
+
+SOLVE_MODES = ("serial", "thread", "process")
+
+ENGINES: Dict[str, SolverEngine] = {}
+BATCH_ENGINES: Dict[str, BatchSolverEngine] = {}
+WARM_ENGINES: Dict[str, WarmSolverEngine] = {}
+default_engine = os.getenv("LTM_SOLVER_ENGINE", "auto")
+default_mode = os.getenv("LTM_SOLVER_MODE", "serial")
+
+# Bases of previous solves per product, see warm_solver
+basis_store = BasisStore(int(os.getenv("LTM_BASIS_STORE_SIZE", "4096")))
+# Plans of problems solved before, shared by solve and solve_batch; LTM_PLAN_CACHE_BYTES=0 disables it
+plan_cache = PlanCache(int(os.getenv("LTM_PLAN_CACHE_BYTES", str(64 * 1024 * 1024))))
+
+def register_engine(name: str, engine: SolverEngine, batch: Optional[BatchSolverEngine] = None,
+                    warm: Optional[WarmSolverEngine] = None):
+    ENGINES[name] = engine
+    if batch is not None:
+        BATCH_ENGINES[name] = batch
+    if warm is not None:
+        WARM_ENGINES[name] = warm
+
+def resolve_engine_name(name: Optional[str] = None) -> str:
+    name = name or default_engine
+    if name == "auto":
+        name = "native" if load_native_library() is not None else "simplex"
+    if name not in ENGINES:
+        raise ValueError(f"Unknown solver engine: {name}. Available: {', '.join(ENGINES)}")
+    return name
+
+def get_engine(name: Optional[str] = None) -> SolverEngine:
+    return ENGINES[resolve_engine_name(name)]
+
+register_engine("native", native_solve, native_solve_batch)
+register_engine("numpy", numpy_solver.solve)
+register_engine("simplex", network_simplex.solve, warm=network_simplex.solve_with_basis)
+
+def warm_solver(name: str, key: Hashable) -> SolverEngine:
+    """Engine that starts from the basis the previous solve of key left for the same cost matrix."""
+    warm = WARM_ENGINES[name]
+
+    def engine(supply, demand, cost, out: Optional[np.ndarray] = None):
+        cost = np.ascontiguousarray(cost, dtype=np.int64).reshape(len(supply), len(demand))
+        store_key = basis_store.key(key, cost)
+        plan, basis = warm(supply, demand, cost, basis_store.get(store_key), out=out)
+        if basis is not None:
+            basis_store.put(store_key, basis)
+        return plan
+
+    return engine
+
+def solve(supply, demand, cost, engine: Optional[str] = None, out: Optional[np.ndarray] = None):
+    """Solves one transportation problem.
+
+    supply, demand and cost may be lists or C-contiguous int32/int64 arrays; the native
+    engine reads such arrays in place. When out is given the plan is written into it,
+    otherwise a plan from plan_cache is returned read-only.
+    """
+    if len(supply) == 0 or len(demand) == 0:
+        if out is None:
+            return np.zeros((len(supply), len(demand)), dtype=np.intc)
+        out[...] = 0
+        return out
+    name = resolve_engine_name(engine)
+    if not plan_cache.enabled:
+        return ENGINES[name](supply, demand, cost, out=out)
+
+    key = plan_cache.key(name, supply, demand, cost)
+    plan = plan_cache.get(key)
+    if plan is None:
+        plan = plan_cache.put(key, ENGINES[name](supply, demand, cost, out=out))
+    if out is None:
+        return plan
+    out[...] = plan
+    return out
+
+def solve_batch(problems, engine: Optional[str] = None, mode: Optional[str] = None,
+                keys: Optional[Sequence[Hashable]] = None) -> List[np.ndarray]:
+    """Solves several (supply, demand, cost) problems, all plans are views into one output buffer.
+
+    mode is "serial" (one batched call where the engine supports it), "thread" (the shared solver
+    thread pool) or "process" (the warm worker processes from process_pool).
+    keys (e.g. product names) enable warm starts from basis_store for engines that support them;
+    the process mode always solves from scratch. Problems found in plan_cache are not solved
+    again, their plans are the read-only cached arrays instead of views of the buffer.
+    """
+    name = resolve_engine_name(engine)
+    mode = mode or default_mode
+    if mode not in SOLVE_MODES:
+        raise ValueError(f"Unknown solve mode: {mode}. Available: {', '.join(SOLVE_MODES)}")
+    problems = list(problems)
+    if not plan_cache.enabled:
+        return _solve_batch(name, mode, problems, keys)
+
+    cache_keys = [plan_cache.key(name, *problem) for problem in problems]
+    plans = [plan_cache.get(key) for key in cache_keys]
+    missing = [k for k, plan in enumerate(plans) if plan is None]
+    if missing:
+        solved = _solve_batch(
+            name, mode, [problems[k] for k in missing],
+            [keys[k] for k in missing] if keys is not None else None
+        )
+        for k, plan in zip(missing, solved):
+            plan_cache.put(cache_keys[k], plan)
+            plans[k] = plan
+    return plans
+
+def _solve_batch(name: str, mode: str, problems, keys: Optional[Sequence[Hashable]]) -> List[np.ndarray]:
+    if mode == "process" and len(problems) > 1:
+        from Backend.Solver.process_pool import process_solve_batch
+        return process_solve_batch(name, problems)
+    if keys is not None and name in WARM_ENGINES:
+        engines = [warm_solver(name, key) for key in keys]
+        if mode == "thread" and len(problems) > 1:
+            return threaded_solve_batch(engines, problems)
+        return generic_solve_batch(engines, problems)
+    if mode == "thread" and len(problems) > 1:
+        return threaded_solve_batch(ENGINES[name], problems)
+    batch = BATCH_ENGINES.get(name)
+    if batch is not None:
+        return batch(problems)
+    return generic_solve_batch(ENGINES[name], problems)
+
+def assign_transport_arrays(lengths, weights, capacities, fuel_costs) -> Tuple[np.ndarray, np.ndarray]:
+    """Cheapest transport for every route over the routes x fleet cost matrix.
+
+    A route needs ceil(weight / capacity) trips (at least one) and costs length * fuel_cost * trips.
+    Ties go to the later transport. Transports without a positive capacity are never chosen.
+    Returns the chosen transport index (-1 and cost 0 if none is usable) and its cost for every route.
+    """
+    lengths = np.asarray(lengths, dtype=np.float64).reshape(-1, 1)
+    weights = np.asarray(weights, dtype=np.float64).reshape(-1, 1)
+    capacities = np.asarray(capacities, dtype=np.float64).reshape(1, -1)
+    fuel_costs = np.asarray(fuel_costs, dtype=np.float64).reshape(1, -1)
+    if lengths.size == 0 or capacities.size == 0:
+        return np.full(lengths.size, -1, dtype=np.intp), np.zeros(lengths.size)
+
+    usable = capacities > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trips = np.maximum(np.ceil(weights / np.where(usable, capacities, 1.0)), 1.0)
+    cost = np.where(usable, lengths * fuel_costs * trips, np.inf)
+
+    last = capacities.size - 1
+    chosen = last - np.argmin(cost[:, ::-1], axis=1)
+    costs = cost[np.arange(cost.shape[0]), chosen]
+    unassigned = ~np.isfinite(costs)
+    chosen[unassigned] = -1
+    costs[unassigned] = 0.0
+    return chosen, costs
+
+def group_by_transport(chosen: np.ndarray) -> Dict[int, np.ndarray]:
+    """Transport index -> positions of its routes, transports in order of their first route; -1 is skipped."""
+    order = np.argsort(chosen, kind="stable")
+    keys, starts = np.unique(chosen[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    result = sorted(
+        ((int(key), positions) for key, positions in zip(keys.tolist(), groups) if key >= 0),
+        key=lambda item: item[1][0]
+    )
+    return dict(result)
+
+def charge_entries(calculation, costs: np.ndarray, positions: np.ndarray):
+    """Adds the costs of all the given entries to the calculation's cost_overall.
+
+    Shared by the per-product and the consolidated assignments, so both price a plan the same way.
+    """
+    calculation.cost_overall += float(costs[positions].sum()) * calculation.cost_per_distance
+
 def assign_transport_to_routes(route_weight, transports: List[Transport]):
-    min_cost = -1
-    chosen_transport = None 
-    for transport in transports:
-        wl = transport.weight_lift
-        trips = 1
-        if wl < route_weight[1]:
-            trips = (route_weight[1] // wl) + 1
-        cost = route_weight[0].length * transport.fuel_cost * trips
-        if cost <= min_cost or min_cost == -1:
-            min_cost = cost
-            chosen_transport = transport
-    return (chosen_transport, route_weight[0], cost)
-
-def assign_transport_from_calculation(calculation: Calculation, transports: List[Transport]):
+    chosen, costs = assign_transport_arrays(
+        [route_weight[0].length], [route_weight[1]],
+        [t.weight_lift for t in transports], [t.fuel_cost for t in transports]
+    )
+    transport = transports[chosen[0]] if chosen[0] >= 0 else None
+    return (transport, route_weight[0], float(costs[0]))
+
+def assign_transport_from_calculation(calculation: Calculation, transports: List[Transport],
+                                      fleet: Optional[FleetFrontier] = None):
+    """Transport -> routes; pass the request's fleet frontier to avoid rebuilding it per calculation."""
+    if fleet is None:
+        fleet = FleetFrontier.from_transports(transports)
+    routes = list(calculation.route_values)
+    weights = np.array(list(calculation.route_values.values()), dtype=np.float64)
+    chosen, costs = fleet.assign([route.length for route in routes], weights)
+    calculation.unassigned_weight += float(weights[chosen < 0].sum())
     result = {}
-    for rw in calculation:
-        tr, rt, cost = assign_transport_to_routes(rw, transports)
-        entry = result.get(tr)
-        if entry == None:
-            result[tr] = []
-            calculation.cost_overall += cost * calculation.cost_per_distance
-        result[tr].append(rt)
-    return result
\ No newline at end of file
+    for transport, positions in group_by_transport(chosen).items():
+        charge_entries(calculation, costs, positions)
+        result[transports[transport]] = [routes[k] for k in positions.tolist()]
+    return result
+
+def group_loads(calculations, sizes: Sequence[int], loads: np.ndarray, units: np.ndarray, costs: np.ndarray,
+                unassigned: np.ndarray) -> List[Dict[int, List[int]]]:
+    """Vehicle -> positions of the calculation's loads (routes), for every calculation.
+
+    loads, units, costs and unassigned describe entries ordered by load, where the loads are the
+    calculations' routes one after another. Every vehicle adds the costs of all its entries, the
+    calculation's shares of the lanes it drives, so the cost follows the consolidated choice;
+    unassigned weight is summed up.
+    """
+    result = []
+    bounds = np.searchsorted(loads, np.cumsum([0] + list(sizes)))
+    start = 0
+    for calculation, size, lo, hi in zip(calculations, sizes, bounds[:-1].tolist(), bounds[1:].tolist()):
+        assigned = {}
+        for unit, positions in group_by_transport(units[lo:hi]).items():
+            charge_entries(calculation, costs, lo + positions)
+            # A lane split over several pieces may put the same route on a vehicle twice
+            assigned[unit] = list(dict.fromkeys((loads[lo + positions] - start).tolist()))
+        calculation.unassigned_weight += float(unassigned[lo:hi].sum())
+        result.append(assigned)
+        start += size
+    return result
+
+def calculation_lanes(calculations: List[Calculation]) -> Tuple[List[List[Route]], Lanes]:
+    """Routes of every calculation and their loads summed per warehouse -> receiver lane."""
+    routes = [list(calculation.route_values) for calculation in calculations]
+    loads = [route for calculation_routes in routes for route in calculation_routes]
+    nodes: Dict[int, int] = {}
+    sources = [nodes.setdefault(id(route.storage_ptr), len(nodes)) for route in loads]
+    targets = [nodes.setdefault(id(route.receiver_ptr), len(nodes)) for route in loads]
+    lanes = Lanes.consolidate(
+        sources, targets, [route.length for route in loads],
+        [weight for calculation in calculations for weight in calculation.route_values.values()], len(nodes)
+    )
+    return routes, lanes
+
+def assign_transport_by_lane(calculations: List[Calculation], transports: List[Transport],
+                             fleet: Optional[FleetFrontier] = None) -> List[Dict[Transport, List[Route]]]:
+    """Transport -> routes for every calculation, with one transport per lane for all products on it.
+
+    The weight of all calculations is summed per lane and sized in a single assignment; every
+    route carries the share of its lane's cost that matches its share of the weight.
+    """
+    if fleet is None:
+        fleet = FleetFrontier.from_transports(transports)
+    routes, lanes = calculation_lanes(calculations)
+    chosen, costs = fleet.assign(lanes.lengths, lanes.weights)
+    groups = group_loads(calculations, [len(r) for r in routes], *lanes.spread_choice(chosen, costs))
+    return [
+        {transports[transport]: [calculation_routes[k] for k in positions] for transport, positions in assigned.items()}
+        for calculation_routes, assigned in zip(routes, groups)
+    ]
+
+def pack_transport_from_calculations(calculations: List[Calculation], transports: List[Transport],
+                                     **kwargs) -> List[Dict[Transport, List[Route]]]:
+    """Vehicle -> routes for every calculation, the lanes of all of them packed onto the limited fleet together.
+
+    Every vehicle is its transport renamed "<name> #<n>". Weight the fleet cannot carry is left
+    out and added to the calculation's unassigned_weight.
+    """
+    routes, lanes = calculation_lanes(calculations)
+    plan = FleetPacker.from_transports(transports, **kwargs).pack(lanes.lengths, lanes.weights)
+    vehicles = [replace(transports[t], name=name)
+                for t, name in zip(plan.unit_types.tolist(), plan.unit_names([t.name for t in transports]))]
+    groups = group_loads(calculations, [len(r) for r in routes], *lanes.spread_plan(plan))
+    return [
+        {vehicles[unit]: [calculation_routes[k] for k in positions] for unit, positions in assigned.items()}
+        for calculation_routes, assigned in zip(routes, groups)
+    ]
+
+@dataclass
+class InstanceCalculation:
+    """Solution of one product of a ProblemInstance.
+
+    routes are instance route indices in plan (row-major) order, amounts the weight shipped on each.
+    """
+    product: int = -1
+    routes: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp))
+    amounts: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    distance_overall: int = 0
+    cost_per_distance: float = 1.0
+    cost_overall: float = 0.0
+    unassigned_weight: float = 0.0
+    undelivered_weight: float = 0.0
+
+def solve_instance(instance: ProblemInstance, cost_per_distance, engine: Optional[str] = None,
+                   mode: Optional[str] = None) -> List[InstanceCalculation]:
+    products = instance.solved_products.tolist()
+    problems = []
+    route_ids = []
+    for product in products:
+        supply, demand, cost, ids, _, _ = instance.product_problem(product)
+        problems.append((supply, demand, cost))
+        route_ids.append(ids)
+    plans = solve_batch(problems, engine, mode, keys=[instance.product_names[p] for p in products])
+
+    calculations = []
+    for product, plan, ids in zip(products, plans, route_ids):
+        # Flow on a pair without a route is demand no route can serve, as in Calculation.calculateRoutes
+        plan = np.asarray(plan)
+        shipped = (plan > 0) & (ids >= 0)
+        stranded = (plan > 0) & (ids < 0)
+        routes = ids[shipped]
+        calculations.append(InstanceCalculation(
+            product=product,
+            routes=routes,
+            amounts=plan[shipped] * instance.product_weights[product],
+            distance_overall=int(instance.route_lengths[routes].sum()),
+            cost_per_distance=cost_per_distance,
+            undelivered_weight=float(plan[stranded].sum() * instance.product_weights[product]),
+        ))
+    return calculations
+
+def assign_transport_from_instance(instance: ProblemInstance, calculation: InstanceCalculation) -> Dict[int, np.ndarray]:
+    """Transport index -> instance route indices, same choice as assign_transport_from_calculation."""
+    chosen, costs = instance.fleet.assign(instance.route_lengths[calculation.routes], calculation.amounts)
+    calculation.unassigned_weight += float(calculation.amounts[chosen < 0].sum())
+    result = {}
+    for transport, positions in group_by_transport(chosen).items():
+        charge_entries(calculation, costs, positions)
+        result[transport] = calculation.routes[positions]
+    return result
+
+def instance_lanes(instance: ProblemInstance, calculations: List[InstanceCalculation]) -> Lanes:
+    routes = np.concatenate([calculation.routes for calculation in calculations] + [np.empty(0, dtype=np.intp)])
+    return Lanes.consolidate(
+        instance.route_from[routes], instance.route_to[routes], instance.route_lengths[routes],
+        np.concatenate([calculation.amounts for calculation in calculations] + [np.empty(0)]), instance.node_count
+    )
+
+def assign_transport_by_lane_from_instance(instance: ProblemInstance,
+                                           calculations: List[InstanceCalculation]) -> List[Dict[int, np.ndarray]]:
+    """Transport index -> instance route indices for every calculation, same choice as assign_transport_by_lane."""
+    lanes = instance_lanes(instance, calculations)
+    chosen, costs = instance.fleet.assign(lanes.lengths, lanes.weights)
+    groups = group_loads(calculations, [c.routes.size for c in calculations], *lanes.spread_choice(chosen, costs))
+    return [
+        {transport: calculation.routes[positions] for transport, positions in assigned.items()}
+        for calculation, assigned in zip(calculations, groups)
+    ]
+
+def pack_transport_from_instance(instance: ProblemInstance, calculations: List[InstanceCalculation],
+                                 **kwargs) -> Tuple[List[Dict[int, np.ndarray]], List[str]]:
+    """Vehicle -> instance route indices for every calculation and the vehicle names, same packing as
+    pack_transport_from_calculations."""
+    lanes = instance_lanes(instance, calculations)
+    plan = instance.fleet_packer(**kwargs).pack(lanes.lengths, lanes.weights)
+    groups = group_loads(calculations, [c.routes.size for c in calculations], *lanes.spread_plan(plan))
+    result = [
+        {unit: calculation.routes[positions] for unit, positions in assigned.items()}
+        for calculation, assigned in zip(calculations, groups)
+    ]
+    return result, plan.unit_names(instance.transport_names)
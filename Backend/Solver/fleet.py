@@ -0,0 +1,523 @@
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Backend.Solver.BaseClasses import Transport
+
+
+class FleetFrontier:
+    """Pareto frontier of a fleet with a breakpoint table for choosing vehicles by weight.
+
+    Makes the same choice as assign_transport_arrays; a lookup is a binary search in the table.
+    """
+
+    def __init__(self, capacities: Sequence[float], fuel_costs: Sequence[float], max_table: int = 1 << 22):
+        capacities = np.asarray(capacities, dtype=np.float64)
+        fuel_costs = np.asarray(fuel_costs, dtype=np.float64)
+        self.max_table = max_table
+        self.all_capacities = capacities
+        self.all_fuel_costs = fuel_costs
+        self.usable = np.flatnonzero(capacities > 0)
+
+        # Largest capacity first, then cheapest, then latest; keep whatever no earlier vehicle beats
+        candidates = self.usable
+        order = candidates[np.lexsort((-candidates, fuel_costs[candidates], -capacities[candidates]))]
+        keep = []
+        cheapest = np.inf
+        latest = -1
+        for k in order.tolist():
+            if fuel_costs[k] < cheapest or (fuel_costs[k] == cheapest and k > latest):
+                keep.append(k)
+                cheapest = fuel_costs[k]
+                latest = k
+
+        self.vehicles = np.array(keep[::-1], dtype=np.intp)
+        self.capacities = capacities[self.vehicles]
+        self.fuel_costs = fuel_costs[self.vehicles]
+        # Frontier positions, latest vehicle first, so that argmin settles ties on it
+        self._latest_first = np.argsort(-self.vehicles, kind="stable")
+        self.breakpoints = np.empty(0)
+        self.best = np.empty(0, dtype=np.intp)
+        self.trips = np.empty(0)
+        self.ambiguous = np.empty(0, dtype=bool)
+        self.max_weight = 0.0
+        self.tabulated = True
+
+    @classmethod
+    def from_transports(cls, transports: List[Transport], **kwargs) -> "FleetFrontier":
+        return cls([t.weight_lift for t in transports], [t.fuel_cost for t in transports], **kwargs)
+
+    def __len__(self):
+        return self.vehicles.size
+
+    def _tabulate(self, max_weight: float):
+        counts = np.ceil(max_weight / self.capacities).astype(np.int64)
+        if int(counts.sum()) * len(self) > self.max_table:
+            self.tabulated = False
+            return
+
+        limits = [_trip_limits(capacity, count) for capacity, count in zip(self.capacities.tolist(), counts.tolist())]
+        breakpoints = np.unique(np.concatenate(limits))
+        # Trips of every vehicle on every interval (previous breakpoint, breakpoint]
+        trips = np.stack([np.searchsorted(m, breakpoints, side="left") + 1 for m in limits], axis=1).astype(np.float64)
+        costs = trips * self.fuel_costs[None, :]
+        best = self._latest_first[np.argmin(costs[:, self._latest_first], axis=1)]
+        lowest = costs[np.arange(best.size), best]
+
+        self.breakpoints = breakpoints
+        self.best = best
+        self.trips = trips[np.arange(best.size), best]
+        self.ambiguous = (costs <= lowest[:, None] * (1 + 1e-9)).sum(axis=1) > 1
+        self.max_weight = float(breakpoints[-1])
+
+    def _scan(self, vehicles: np.ndarray, lengths: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Cheapest of vehicles (original indices) for every route, as assign_transport_arrays computes it."""
+        trips = np.maximum(np.ceil(weights[:, None] / self.all_capacities[vehicles][None, :]), 1.0)
+        costs = lengths[:, None] * self.all_fuel_costs[vehicles][None, :] * trips
+        latest_first = np.argsort(-vehicles, kind="stable")
+        best = latest_first[np.argmin(costs[:, latest_first], axis=1)]
+        return vehicles[best], costs[np.arange(best.size), best]
+
+    def assign(self, lengths, weights) -> Tuple[np.ndarray, np.ndarray]:
+        """Chosen transport (index into the original fleet, -1 if none is usable) and its cost for every route."""
+        lengths = np.asarray(lengths, dtype=np.float64).ravel()
+        weights = np.asarray(weights, dtype=np.float64).ravel()
+        if len(self) == 0 or lengths.size == 0:
+            return np.full(lengths.size, -1, dtype=np.intp), np.zeros(lengths.size)
+
+        chosen = np.empty(lengths.size, dtype=np.intp)
+        costs = np.empty(lengths.size)
+        reversed_ = lengths <= 0
+        if reversed_.any():
+            chosen[reversed_], costs[reversed_] = self._scan(self.usable, lengths[reversed_], weights[reversed_])
+        rest = np.flatnonzero(~reversed_)
+        if rest.size == 0:
+            return chosen, costs
+        lengths, weights = lengths[rest], weights[rest]
+
+        heaviest = float(weights.max())
+        if self.tabulated and (self.breakpoints.size == 0 or heaviest > self.max_weight):
+            self._tabulate(max(heaviest, 2 * self.max_weight, float(self.capacities[-1])))
+        if not self.tabulated:
+            chosen[rest], costs[rest] = self._scan(self.vehicles, lengths, weights)
+            return chosen, costs
+
+        interval = np.searchsorted(self.breakpoints, weights, side="left")
+        best = self.best[interval]
+        chosen[rest] = self.vehicles[best]
+        costs[rest] = lengths * self.fuel_costs[best] * self.trips[interval]
+        close = self.ambiguous[interval]
+        if close.any():
+            chosen[rest[close]], costs[rest[close]] = self._scan(self.vehicles, lengths[close], weights[close])
+        return chosen, costs
+
+
+def _trip_limits(capacity: float, count: int) -> np.ndarray:
+    """Largest weight that takes 1, ..., count trips of a vehicle, by the float rule ceil(w / capacity).
+
+    k * capacity may round to either side of that weight, so it is moved by single ulps until
+    it is the last one at k trips.
+    """
+    trips = np.arange(1, count + 1, dtype=np.float64)
+    limits = trips * capacity
+    while True:
+        over = np.ceil(limits / capacity) > trips
+        limits[over] = np.nextafter(limits[over], -np.inf)
+        under = np.ceil(np.nextafter(limits, np.inf) / capacity) <= trips
+        limits[under] = np.nextafter(limits[under], np.inf)
+        if not (over.any() or under.any()):
+            return limits
+
+
+def fleet_limits_from_json(transport: Dict, distance_coef=1) -> Tuple[int, float, float]:
+    """Vehicle count ("count", -1 for any number), shift limit ("shift", in route distance units,
+    inf for none) and trips per shift ("trips", inf for none) of a transport entry; missing, empty
+    or malformed values mean no limit."""
+    vehicles, shift, trips = -1, np.inf, np.inf
+    try:
+        if transport.get("count", "") != "":
+            vehicles = max(int(transport["count"]), 0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        if transport.get("shift", "") != "":
+            shift = float(transport["shift"]) * distance_coef
+    except (TypeError, ValueError):
+        pass
+    try:
+        if transport.get("trips", "") != "":
+            trips = float(max(int(transport["trips"]), 0))
+    except (TypeError, ValueError):
+        pass
+    return vehicles, shift, trips
+
+
+def fleet_is_limited(counts, shift_limits) -> bool:
+    """Whether any vehicle type has a count (>= 0) or a finite shift limit."""
+    return bool((np.asarray(counts) >= 0).any() or np.isfinite(np.asarray(shift_limits, dtype=np.float64)).any())
+
+
+@dataclass
+class FleetPlan:
+    """Route loads packed onto individual vehicles.
+
+    Every piece is a route load or a part of one: its route position, the vehicle carrying it
+    (-1 for weight no vehicle could take), the weight, and the trips and cost that takes.
+    Pieces are ordered by route. unit_types maps a vehicle to its type (index into the fleet)
+    and unit_ordinals numbers the vehicles of each type from 1; unit_shifts is the distance
+    each vehicle drives.
+    """
+    routes: np.ndarray
+    units: np.ndarray
+    weights: np.ndarray
+    trips: np.ndarray
+    costs: np.ndarray
+    unit_types: np.ndarray
+    unit_ordinals: np.ndarray
+    unit_shifts: np.ndarray
+
+    @property
+    def unassigned_weight(self) -> float:
+        return float(self.weights[self.units < 0].sum())
+
+    def unit_names(self, type_names: Sequence[str]) -> List[str]:
+        """Vehicle names, "<type name> #<ordinal>"."""
+        return [f"{type_names[t]} #{n}" for t, n in zip(self.unit_types.tolist(), self.unit_ordinals.tolist())]
+
+    def slice(self, start: int, stop: int) -> Tuple[int, int]:
+        """Piece range of the routes in [start, stop)."""
+        lo, hi = np.searchsorted(self.routes, [start, stop])
+        return int(lo), int(hi)
+
+
+class FleetPacker:
+    """Packs route loads onto a finite fleet.
+
+    counts[t] vehicles of type t are available (-1 for any number). During its shift every
+    vehicle drives at most shift_limits[t] and makes at most trip_limits[t] trips (inf for no
+    limit). A vehicle of a counted type with neither limit makes a single trip: otherwise one
+    vehicle could carry every load and the count would limit nothing. A load of weight w on a
+    route of length L takes a vehicle of capacity c ceil(w / c) trips (at least one), which cost
+    L * fuel * trips and use L * trips of its shift.
+
+    Loads are placed largest shift usage first, each on the open vehicle with the most shift left
+    of its cheapest type that can take it, opening a new vehicle while the count allows. A load
+    no single vehicle can take is split trip by trip over the vehicles with room; what is left
+    after that stays unassigned. Relocations to cheaper types and swaps with pieces on the
+    swap_types types cheapest for a piece then lower the cost, for at most max_passes passes.
+    With unlimited vehicles and no limits every load ends up on its cheapest type, as with
+    FleetFrontier.
+    """
+
+    def __init__(self, capacities: Sequence[float], fuel_costs: Sequence[float],
+                 counts: Optional[Sequence[int]] = None, shift_limits: Optional[Sequence[float]] = None,
+                 trip_limits: Optional[Sequence[float]] = None, max_passes: int = 2, swap_types: int = 8):
+        self.capacities = np.asarray(capacities, dtype=np.float64)
+        self.fuel_costs = np.asarray(fuel_costs, dtype=np.float64)
+        types = self.capacities.size
+        self.counts = np.full(types, -1, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.shift_limits = (np.full(types, np.inf) if shift_limits is None
+                             else np.asarray(shift_limits, dtype=np.float64))
+        trip_limits = np.full(types, np.inf) if trip_limits is None else np.asarray(trip_limits, dtype=np.float64)
+        single = (self.counts >= 0) & ~np.isfinite(self.shift_limits) & ~np.isfinite(trip_limits)
+        self.trip_limits = np.where(single, 1.0, np.floor(trip_limits))
+        self.usable = (self.capacities > 0) & (self.counts != 0) & (self.trip_limits >= 1)
+        self.max_passes = max_passes
+        self.swap_types = swap_types
+
+    @classmethod
+    def from_transports(cls, transports: List[Transport], **kwargs) -> "FleetPacker":
+        return cls([t.weight_lift for t in transports], [t.fuel_cost for t in transports],
+                   [t.count for t in transports], [t.shift_limit for t in transports],
+                   [t.trip_limit for t in transports], **kwargs)
+
+    def _costs(self, lengths: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Cost, shift usage and trips of every load on every type, inf where the type cannot be used."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            trips = np.maximum(np.ceil(weights[:, None] / np.where(self.usable, self.capacities, 1.0)[None, :]), 1.0)
+        needs = lengths[:, None] * trips
+        costs = needs * self.fuel_costs[None, :]
+        unusable = ~self.usable[None, :]
+        return (np.where(unusable, np.inf, costs), np.where(unusable, np.inf, needs),
+                np.where(unusable, np.inf, trips))
+
+    def _preference(self, costs: np.ndarray, needs: np.ndarray, trips: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Types a load fits on whole, cheapest first and the larger one on ties, and their costs.
+
+        Types it does not fit on sort last with an infinite cost.
+        """
+        costs = np.where((needs <= self.shift_limits) & (trips <= self.trip_limits), costs, np.inf)
+        preference = np.lexsort((np.broadcast_to(-self.capacities, costs.shape), costs), axis=1)
+        return preference, np.take_along_axis(costs, preference, axis=1)
+
+    def pack(self, lengths, weights) -> FleetPlan:
+        lengths = np.asarray(lengths, dtype=np.float64).ravel()
+        weights = np.asarray(weights, dtype=np.float64).ravel()
+        types = self.capacities.size
+        self._types = np.empty(16, dtype=np.intp)
+        self._used = np.empty(16, dtype=np.float64)
+        self._trips = np.empty(16, dtype=np.float64)
+        self._versions = np.empty(16, dtype=np.int64)
+        self._units = 0
+        self._opened = np.zeros(types, dtype=np.int64)
+        self._openable = self.usable & (self.counts != 0)
+        # Open vehicles of every type that can still make a trip, most shift left on top; entries
+        # of a vehicle loaded since are stale and dropped when they come up
+        self._heaps: List[List[Tuple[float, float, int, int]]] = [[] for _ in range(types)]
+        self._members: List[List[int]] = [[] for _ in range(types)]
+        self._max_room = np.full(types, -np.inf)
+        pieces: List[Tuple[int, int, float]] = []
+
+        costs, needs, trips = self._costs(lengths, weights)
+        preference, ranked = self._preference(costs, needs, trips)
+        whole = np.isfinite(ranked).sum(axis=1)
+        smallest_need = needs.min(axis=1, initial=np.inf)
+        for k in np.argsort(-smallest_need, kind="stable").tolist():
+            unit = self._place_whole(preference[k, :whole[k]], needs[k], trips[k])
+            if unit >= 0:
+                pieces.append((k, unit, weights[k]))
+            else:
+                pieces.extend((k, unit, weight) for unit, weight in self._place_split(costs[k], lengths[k], weights[k]))
+
+        routes = np.array([piece[0] for piece in pieces], dtype=np.intp)
+        units = np.array([piece[1] for piece in pieces], dtype=np.intp)
+        piece_weights = np.array([piece[2] for piece in pieces], dtype=np.float64)
+        if routes.size:
+            self._improve(lengths[routes], piece_weights, units)
+        return self._plan(lengths, routes, units, piece_weights)
+
+    # Vehicles
+
+    def _open(self, t: int) -> int:
+        if not self._openable[t]:
+            return -1
+        if self._units == self._types.size:
+            self._types = np.concatenate([self._types, np.empty_like(self._types)])
+            self._used = np.concatenate([self._used, np.empty_like(self._used)])
+            self._trips = np.concatenate([self._trips, np.empty_like(self._trips)])
+            self._versions = np.concatenate([self._versions, np.empty_like(self._versions)])
+        unit = self._units
+        self._types[unit] = t
+        self._used[unit] = 0.0
+        self._trips[unit] = 0.0
+        self._versions[unit] = 0
+        self._units += 1
+        self._opened[t] += 1
+        self._openable[t] = not 0 <= self.counts[t] <= self._opened[t]
+        self._members[t].append(unit)
+        self._push(unit)
+        return unit
+
+    def _push(self, unit: int):
+        t = self._types[unit]
+        if self._trips[unit] + 1 <= self.trip_limits[t]:
+            key = (self._used[unit] - self.shift_limits[t], self._trips[unit] - self.trip_limits[t])
+            heapq.heappush(self._heaps[t], (*key, int(self._versions[unit]), unit))
+        heap = self._heaps[t]
+        while heap and heap[0][2] != self._versions[heap[0][3]]:
+            heapq.heappop(heap)
+        self._max_room[t] = -heap[0][0] if heap else -np.inf
+
+    def _load(self, unit: int, need: float, trips: float):
+        self._used[unit] += need
+        self._trips[unit] += trips
+        self._versions[unit] += 1
+        self._push(unit)
+
+    def _find(self, t: int, need: float, trips: float) -> int:
+        """Open vehicle of type t with need of its shift and trips trips left, the roomiest if it has the trips."""
+        if self._max_room[t] < need:
+            return -1
+        unit = self._heaps[t][0][3]
+        if self._trips[unit] + trips <= self.trip_limits[t]:
+            return unit
+        members = np.array(self._members[t], dtype=np.intp)
+        fits = members[(self._used[members] + need <= self.shift_limits[t])
+                       & (self._trips[members] + trips <= self.trip_limits[t])]
+        return int(fits[0]) if fits.size else -1
+
+    def _place_whole(self, order: np.ndarray, needs: np.ndarray, trips: np.ndarray) -> int:
+        """Places a load on the first type of order with a vehicle that takes it or one left to open."""
+        for t in order[(self._max_room[order] >= needs[order]) | self._openable[order]].tolist():
+            unit = self._find(t, needs[t], trips[t])
+            if unit < 0:
+                unit = self._open(t)
+            if unit >= 0:
+                self._load(unit, needs[t], trips[t])
+                return unit
+        return -1
+
+    def _place_split(self, costs: np.ndarray, length: float, weight: float) -> List[Tuple[int, float]]:
+        parts = []
+        order = np.lexsort((-self.capacities, costs))
+        order = order[np.isfinite(costs[order]) & (length <= self.shift_limits[order])]
+        for t in order[(self._max_room[order] >= length) | self._openable[order]].tolist():
+            capacity, limit = self.capacities[t], self.shift_limits[t]
+            while weight > 0:
+                unit = self._find(t, length, 1.0)
+                if unit < 0:
+                    unit = self._open(t)
+                if unit < 0:
+                    break
+                room = limit - self._used[unit]
+                trips = min(np.floor(room / length) if length > 0 else np.inf,
+                            self.trip_limits[t] - self._trips[unit], np.ceil(weight / capacity))
+                part = min(weight, trips * capacity)
+                self._load(unit, length * trips, trips)
+                parts.append((unit, part))
+                weight -= part
+            if weight <= 0:
+                return parts
+        parts.append((-1, weight))
+        return parts
+
+    # Local improvement
+
+    def _improve(self, lengths: np.ndarray, weights: np.ndarray, units: np.ndarray):
+        costs, needs, trips = self._costs(lengths, weights)
+        preference, ranked = self._preference(costs, needs, trips)
+        cheapest = costs.min(axis=1, initial=np.inf)
+        pieces = np.arange(units.size)
+        types = costs.shape[1]
+        nearest = preference[:, :self.swap_types]
+
+        for _ in range(self.max_passes):
+            improved = False
+            unit_types = self._types[:self._units]
+            current = np.full(units.size, np.inf)
+            assigned = units >= 0
+            current[assigned] = costs[pieces[assigned], unit_types[units[assigned]]]
+
+            # Relocate a piece that is off its cheapest type to a cheaper type, on its roomiest
+            # vehicle or on a new one, largest saving first. Pieces with no cheaper type that has
+            # room or a vehicle left at the start of the pass wait for the next one.
+            movable = np.flatnonzero(current > cheapest)
+            room = (self._max_room[None, :] >= needs[movable]) | self._openable[None, :]
+            movable = movable[(room & (costs[movable] < current[movable, None])).any(axis=1)]
+            for k in movable[np.argsort(cheapest[movable] - current[movable], kind="stable")].tolist():
+                unit = int(units[k])
+                cheaper = int(np.searchsorted(ranked[k], current[k], side="left"))
+                target = self._place_whole(preference[k, :cheaper], needs[k], trips[k])
+                if target < 0:
+                    continue
+                if unit >= 0:
+                    self._load(unit, -needs[k, self._types[unit]], -trips[k, self._types[unit]])
+                units[k] = target
+                improved = True
+
+            # Swap a piece that is off its cheapest type with one on a vehicle of a type cheap for it.
+            # Pieces are kept grouped by type in slots; a swap exchanges two slots, so the groups stay valid.
+            unit_types = self._types[:self._units]
+            assigned = units >= 0
+            piece_types = np.full(units.size, types, dtype=np.intp)
+            piece_types[assigned] = unit_types[units[assigned]]
+            slots = np.argsort(piece_types, kind="stable")
+            slot_of = np.empty_like(slots)
+            slot_of[slots] = np.arange(slots.size)
+            bounds = np.searchsorted(piece_types[slots], np.arange(types + 1))
+            own = np.full(units.size, np.inf)
+            own[assigned] = costs[pieces[assigned], piece_types[assigned]]
+            # Shift and trips a piece's vehicle would have left without it
+            slack = np.full(units.size, -np.inf)
+            trip_slack = np.full(units.size, -np.inf)
+            slack[assigned] = (self.shift_limits[piece_types[assigned]] - self._used[units[assigned]]
+                               + needs[pieces[assigned], piece_types[assigned]])
+            trip_slack[assigned] = (self.trip_limits[piece_types[assigned]] - self._trips[units[assigned]]
+                                    + trips[pieces[assigned], piece_types[assigned]])
+            on_unit: Dict[int, List[int]] = {}
+            for k, unit in enumerate(units.tolist()):
+                on_unit.setdefault(unit, []).append(k)
+            # lowest[tb, ta]: the least a piece on type tb gains by moving to type ta. It is only
+            # lowered during the pass; a swap that cannot save even against it is not looked for.
+            lowest = np.full((types + 1, types), np.inf)
+            for t in range(types):
+                group = slots[bounds[t]:bounds[t + 1]]
+                if group.size:
+                    lowest[t] = (costs[group] - own[group, None]).min(axis=0)
+            swappable = np.flatnonzero(assigned & (own > cheapest))
+            gains = costs[swappable[:, None], nearest[swappable]] - own[swappable, None]
+            hopeful = (gains < 0) & (gains + lowest[nearest[swappable], piece_types[swappable, None]] < 0)
+            # Pieces of type tb ordered by what they gain moving to type ta, per (tb, ta) looked at;
+            # dropped for both types of a swap, whose groups change
+            movers: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+            for k in swappable[hopeful.any(axis=1)].tolist():
+                ta = int(piece_types[k])
+                gain = costs[k, nearest[k]] - own[k]
+                parts, deltas = [], []
+                for tb, gain_tb in zip(nearest[k].tolist(), gain.tolist()):
+                    if not (gain_tb < 0 and gain_tb + lowest[tb, ta] < 0):
+                        continue
+                    if (tb, ta) not in movers:
+                        group = slots[bounds[tb]:bounds[tb + 1]]
+                        change = costs[group, ta] - own[group]
+                        order = np.argsort(change, kind="stable")
+                        movers[tb, ta] = group[order], change[order]
+                    group, change = movers[tb, ta]
+                    saving = int(np.searchsorted(change, -gain_tb - 1e-9 * max(1.0, own[k]), side="left"))
+                    if saving:
+                        parts.append(group[:saving])
+                        deltas.append(change[:saving] + gain_tb)
+                if not parts:
+                    continue
+                candidates, delta = np.concatenate(parts), np.concatenate(deltas)
+                tb_of = piece_types[candidates]
+                fits = ((needs[candidates, ta] <= slack[k]) & (trips[candidates, ta] <= trip_slack[k])
+                        & (needs[k, tb_of] <= slack[candidates]) & (trips[k, tb_of] <= trip_slack[candidates]))
+                if not fits.any():
+                    continue
+                q = int(candidates[np.flatnonzero(fits)[delta[fits].argmin()]])
+                a, b, tb = int(units[k]), int(units[q]), int(piece_types[q])
+                self._load(a, needs[q, ta] - needs[k, ta], trips[q, ta] - trips[k, ta])
+                self._load(b, needs[k, tb] - needs[q, tb], trips[k, tb] - trips[q, tb])
+                units[k], units[q] = b, a
+                on_unit[a][on_unit[a].index(k)] = q
+                on_unit[b][on_unit[b].index(q)] = k
+                piece_types[k], piece_types[q] = tb, ta
+                own[k], own[q] = costs[k, tb], costs[q, ta]
+                slots[slot_of[k]], slots[slot_of[q]] = q, k
+                slot_of[k], slot_of[q] = slot_of[q], slot_of[k]
+                np.minimum(lowest[tb], costs[k] - own[k], out=lowest[tb])
+                np.minimum(lowest[ta], costs[q] - own[q], out=lowest[ta])
+                for key in [key for key in movers if key[0] in (ta, tb)]:
+                    del movers[key]
+                for unit in (a, b):
+                    on = np.array(on_unit[unit], dtype=np.intp)
+                    t = self._types[unit]
+                    slack[on] = self.shift_limits[t] - self._used[unit] + needs[on, t]
+                    trip_slack[on] = self.trip_limits[t] - self._trips[unit] + trips[on, t]
+                improved = True
+
+            if not improved:
+                break
+
+    def _plan(self, lengths: np.ndarray, routes: np.ndarray, units: np.ndarray, weights: np.ndarray) -> FleetPlan:
+        # Pieces in route order; vehicles left empty by the improvement are dropped
+        order = np.lexsort((units, routes))
+        routes, units, weights = routes[order], units[order], weights[order]
+        unit_types = self._types[:self._units]
+        used = self._used[:self._units]
+
+        kept = np.unique(units[units >= 0])
+        renumber = np.full(unit_types.size + 1, -1, dtype=np.intp)
+        renumber[kept] = np.arange(kept.size)
+        units = renumber[units]
+        unit_types = unit_types[kept]
+        ordinals = np.zeros(kept.size, dtype=np.int64)
+        for t in np.unique(unit_types).tolist():
+            same = unit_types == t
+            ordinals[same] = np.arange(1, int(same.sum()) + 1)
+
+        assigned = units >= 0
+        trips = np.zeros(routes.size)
+        costs = np.zeros(routes.size)
+        if assigned.any():
+            types = unit_types[units[assigned]]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                trips[assigned] = np.maximum(np.ceil(weights[assigned] / self.capacities[types]), 1.0)
+            costs[assigned] = lengths[routes[assigned]] * self.fuel_costs[types] * trips[assigned]
+        return FleetPlan(
+            routes=routes, units=units, weights=weights, trips=trips.astype(np.int64), costs=costs,
+            unit_types=unit_types, unit_ordinals=ordinals, unit_shifts=used[kept],
+        )
@@ -0,0 +1,223 @@
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Backend.Solver.BaseClasses import Product, ProductStorage, Transport
+from Backend.Solver.fleet import FleetFrontier, FleetPacker, fleet_is_limited, fleet_limits_from_json
+from Backend.Solver.RouteClasses import Route, prohibit_missing_routes
+
+
+@dataclass
+class ProblemInstance:
+    """Struct-of-arrays view of one compute-routes request.
+
+    Nodes are the warehouses followed by the destinations; a node key (name, address) that
+    occurs twice resolves to its last entry, as with the storage lookup of build_Route_from_json.
+    quantities and holds are products x nodes, holds marks the cargos a node lists (even with
+    quantity 0). Routes whose endpoints are unknown are dropped. Only products held by some
+    warehouse are solved.
+    """
+    node_names: List[str]
+    node_addresses: List[str]
+    warehouse_count: int
+    product_names: List[str]
+    product_weights: np.ndarray
+    quantities: np.ndarray
+    holds: np.ndarray
+    route_from: np.ndarray
+    route_to: np.ndarray
+    route_lengths: np.ndarray
+    route_payloads: List[Dict]
+    transport_names: List[str]
+    transport_capacities: np.ndarray
+    transport_fuel_costs: np.ndarray
+    transport_counts: np.ndarray
+    transport_shift_limits: np.ndarray
+    transport_trip_limits: np.ndarray
+    node_index: Dict[Tuple[str, str], int] = field(default_factory=dict)
+
+    @classmethod
+    def from_json(cls, warehouses_json: List[Dict], destinations_json: List[Dict], routes_json: List[Dict],
+                  transport_json: List[Dict], weight_coef=1.0, distance_coef: int = 1,
+                  weight_lift_coef=1.0, fuel_cost_coef=1.0) -> "ProblemInstance":
+        entries = list(warehouses_json) + list(destinations_json)
+        node_names = [entry["name"] for entry in entries]
+        node_addresses = [entry["address"] for entry in entries]
+        node_index = {key: k for k, key in enumerate(zip(node_names, node_addresses))}
+
+        product_ids: Dict[str, int] = {}
+        weights: List[float] = []
+        cells: Dict[Tuple[int, int], int] = {}
+        for k, entry in enumerate(entries):
+            for cargo in entry.get("cargos", []):
+                p = product_ids.get(cargo["type"])
+                if p is None:
+                    p = product_ids[cargo["type"]] = len(weights)
+                    weights.append(float(cargo["weight"]) * weight_coef)
+                cells[(p, k)] = int(cargo["quantity"])
+
+        quantities = np.zeros((len(weights), len(entries)), dtype=np.int64)
+        holds = np.zeros((len(weights), len(entries)), dtype=bool)
+        if cells:
+            rows, cols = np.array(list(cells), dtype=np.intp).T
+            quantities[rows, cols] = list(cells.values())
+            holds[rows, cols] = True
+
+        route_from, route_to, route_lengths, route_payloads = [], [], [], []
+        for route in routes_json:
+            source = node_index.get((route["from"], route["from_address"]))
+            target = node_index.get((route["to"], route["to_address"]))
+            if source is None or target is None:
+                continue
+            route_from.append(source)
+            route_to.append(target)
+            route_lengths.append(int(route.get("distance_m", -1)) * distance_coef)
+            route_payloads.append(route)
+
+        names, capacities, fuel_costs, counts, shift_limits, trip_limits = [], [], [], [], [], []
+        for transport in transport_json:
+            wl = 0
+            fc = 1.0
+            try:
+                wl = float(transport.get("capacity", "-1")) * weight_lift_coef
+                fc = float(transport.get("fuel", "1")) * fuel_cost_coef
+            except (TypeError, ValueError):
+                pass
+            vehicles, shift, trips = fleet_limits_from_json(transport, distance_coef)
+            names.append(transport.get("name", "unnamed"))
+            capacities.append(wl)
+            fuel_costs.append(fc)
+            counts.append(vehicles)
+            shift_limits.append(shift)
+            trip_limits.append(trips)
+
+        return cls(
+            node_names=node_names,
+            node_addresses=node_addresses,
+            warehouse_count=len(warehouses_json),
+            product_names=list(product_ids),
+            product_weights=np.array(weights, dtype=np.float64),
+            quantities=quantities,
+            holds=holds,
+            route_from=np.array(route_from, dtype=np.intp),
+            route_to=np.array(route_to, dtype=np.intp),
+            route_lengths=np.array(route_lengths, dtype=np.int64),
+            route_payloads=route_payloads,
+            transport_names=names,
+            transport_capacities=np.array(capacities, dtype=np.float64),
+            transport_fuel_costs=np.array(fuel_costs, dtype=np.float64),
+            transport_counts=np.array(counts, dtype=np.int64),
+            transport_shift_limits=np.array(shift_limits, dtype=np.float64),
+            transport_trip_limits=np.array(trip_limits, dtype=np.float64),
+            node_index=node_index,
+        )
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_names)
+
+    @property
+    def route_count(self) -> int:
+        return len(self.route_payloads)
+
+    @cached_property
+    def solved_products(self) -> np.ndarray:
+        """Products held by at least one warehouse, in order of first appearance."""
+        return np.flatnonzero(self.holds[:, :self.warehouse_count].any(axis=1))
+
+    @cached_property
+    def fleet(self) -> "FleetFrontier":
+        return FleetFrontier(self.transport_capacities, self.transport_fuel_costs)
+
+    @property
+    def fleet_limited(self) -> bool:
+        return fleet_is_limited(self.transport_counts, self.transport_shift_limits)
+
+    def fleet_packer(self, **kwargs) -> FleetPacker:
+        return FleetPacker(self.transport_capacities, self.transport_fuel_costs,
+                           self.transport_counts, self.transport_shift_limits, self.transport_trip_limits, **kwargs)
+
+    @cached_property
+    def _pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Per (from, to) pair: its first route (fixes line and column order) and its last route (the one used)
+        codes = self.route_from * self.node_count + self.route_to
+        _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        last = np.full(first.size, -1, dtype=np.intp)
+        last[inverse] = np.arange(codes.size)
+        order = np.sort(first)
+        return order, last[inverse[order]]
+
+    def product_problem(self, product: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Supply, demand, cost, route indices (-1 for none), line nodes and column nodes of one product.
+
+        Lines and columns follow the order of the product's first routes, like build_RouteMatrix.
+        Pairs without a route get a prohibitive cost, see prohibit_missing_routes.
+        """
+        first, last = self._pairs
+        holds = self.holds[product]
+        keep = holds[self.route_from[first]] & holds[self.route_to[first]]
+        first, last = first[keep], last[keep]
+
+        lines, line_of = _ordered_unique(self.route_from[first])
+        columns, column_of = _ordered_unique(self.route_to[first])
+        route_ids = np.full((lines.size, columns.size), -1, dtype=np.intp)
+        route_ids[line_of, column_of] = last
+        routed = route_ids >= 0
+        cost = prohibit_missing_routes(np.where(routed, self.route_lengths[route_ids], -1), routed)
+        quantities = self.quantities[product]
+        return quantities[lines], quantities[columns], cost, route_ids, lines, columns
+
+    # Object graph for the legacy builders' callers, built only when asked for
+
+    @cached_property
+    def products(self) -> List[Product]:
+        from Backend.Solver.ClassBuilder import get_or_create_product
+        return [get_or_create_product(name, weight) for name, weight in zip(self.product_names, self.product_weights.tolist())]
+
+    @cached_property
+    def nodes(self) -> List[ProductStorage]:
+        result = [ProductStorage(name=name, address=address) for name, address in zip(self.node_names, self.node_addresses)]
+        for p, k in zip(*np.nonzero(self.holds)):
+            result[k].insert(self.products[p], int(self.quantities[p, k]))
+        return result
+
+    @property
+    def warehouses(self) -> List[ProductStorage]:
+        return self.nodes[:self.warehouse_count]
+
+    @property
+    def destinations(self) -> List[ProductStorage]:
+        return self.nodes[self.warehouse_count:]
+
+    @cached_property
+    def routes(self) -> List[Route]:
+        nodes = self.nodes
+        return [
+            Route(id=k + 1, length=length, storage_ptr=nodes[source], receiver_ptr=nodes[target],
+                  payloads=self.route_payloads)
+            for k, (source, target, length) in enumerate(zip(
+                self.route_from.tolist(), self.route_to.tolist(), self.route_lengths.tolist()
+            ))
+        ]
+
+    @cached_property
+    def transports(self) -> List[Transport]:
+        return [
+            Transport(id=k + 1, name=name, fuel_cost=fuel, weight_lift=capacity, count=vehicles, shift_limit=shift,
+                      trip_limit=trips)
+            for k, (name, capacity, fuel, vehicles, shift, trips) in enumerate(zip(
+                self.transport_names, self.transport_capacities.tolist(), self.transport_fuel_costs.tolist(),
+                self.transport_counts.tolist(), self.transport_shift_limits.tolist(), self.transport_trip_limits.tolist()
+            ))
+        ]
+
+
+def _ordered_unique(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct values in order of first appearance and the position of every value among them."""
+    unique, first, inverse = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    return unique[order], rank[inverse]
@@ -0,0 +1,237 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    """One submitted computation with its status, progress, timing and outcome.
+
+    version grows with every change, so a watcher can wait for the next one.
+    """
+
+    def __init__(self, job_id: str, owner: Optional[str], manager: "JobManager"):
+        self.id = job_id
+        self.owner = owner
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.progress = 0.0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.traceback: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self._manager = manager
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, stage: str, progress: Optional[float] = None):
+        """Called by the running job; raises JobCancelled once cancellation was requested."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        with self._manager._changed:
+            self.stage = stage
+            if progress is not None:
+                self.progress = float(progress)
+            self._touch()
+
+    def _touch(self):
+        self.version += 1
+        self._manager._changed.notify_all()
+
+    def timing(self) -> Dict[str, Optional[float]]:
+        now = time.time()
+        started = self.started_at
+        finished = self.finished_at
+        return {
+            "queued_s": (started or finished or now) - self.submitted_at,
+            "run_s": (finished or now) - started if started is not None else None,
+            "total_s": (finished or now) - self.submitted_at,
+        }
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "timing": self.timing(),
+            "version": self.version,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.status == DONE:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Runs submitted jobs on a bounded pool of worker threads.
+
+    At most max_queued jobs wait for a worker; submit raises QueueFull beyond that so the
+    caller can answer with back-pressure instead of piling up work. A queued job is cancelled
+    at once, a running one stops at its next report(). Finished jobs are kept for
+    keep_finished_s seconds (at most keep_finished of them) so clients can fetch the result.
+    Jobs live in the process that accepted them.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 16, keep_finished: int = 256,
+                 keep_finished_s: float = 3600.0):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self.keep_finished_s = keep_finished_s
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._changed = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ltm-job")
+        return self._executor
+
+    def _count(self, status: str) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _prune(self):
+        deadline = time.time() - self.keep_finished_s
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.keep_finished
+        for job in finished:
+            if excess > 0 or job.finished_at < deadline:
+                del self._jobs[job.id]
+                excess -= 1
+
+    def submit(self, fn: Callable[..., Any], *args, owner: Optional[str] = None, **kwargs) -> Job:
+        """Queues fn(job, *args, **kwargs); its return value becomes the job's result."""
+        with self._changed:
+            self._prune()
+            if self._count(QUEUED) >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(f"{self.max_queued} jobs are already waiting")
+            job = Job(uuid.uuid4().hex, owner, self)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            job._future = self._pool().submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        with self._changed:
+            if job.finished:
+                return
+            job.status = job.stage = RUNNING
+            job.started_at = time.time()
+            job._touch()
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            result = fn(job, *args, **kwargs)
+            status, error = DONE, None
+        except JobCancelled:
+            result, status, error = None, CANCELLED, None
+        except Exception as e:
+            result, status, error = None, FAILED, f"{type(e).__name__}: {e}"
+            job.traceback = traceback.format_exc()
+        self._finish(job, status, result, error)
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        with self._changed:
+            job.status = job.stage = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            if status == DONE:
+                job.progress = 1.0
+                self.completed += 1
+            elif status == FAILED:
+                self.failed += 1
+            else:
+                self.cancelled += 1
+            job._touch()
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        """The job, or None if it is unknown or belongs to someone else."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def cancel(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        """Requests cancellation of the job, None if there is no such job of owner.
+
+        Cancellation is cooperative: a queued job is finished as cancelled at once, a running one
+        only when it next calls report(), so the stage it is in runs to its end.
+        """
+        job = self.get(job_id, owner)
+        if job is None or job.finished:
+            return job
+        job._cancel.set()
+        # A job still waiting for a worker never starts
+        if job._future is not None and job._future.cancel():
+            self._finish(job, CANCELLED)
+        return job
+
+    def wait(self, job: Job, version: int, timeout: float) -> bool:
+        """Waits until job changes past version (True) or timeout passes (False)."""
+        with self._changed:
+            return self._changed.wait_for(lambda: job.version > version, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._changed:
+            return {
+                "workers": self.workers,
+                "queued": self._count(QUEUED),
+                "running": self._count(RUNNING),
+                "max_queued": self.max_queued,
+                "kept": len(self._jobs),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+            }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            for job in list(self._jobs.values()):
+                if not job.finished:
+                    self.cancel(job.id)
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+from Backend.Solver.fleet import FleetPlan
+
+
+class LaneIndex:
+    """Dense ids for warehouse -> receiver lanes given as integer node ids.
+
+    A lane is keyed by source * stride + target in a dict, so ids stay stable while more
+    lanes are added and looking one up is a single hash probe.
+    """
+
+    def __init__(self, stride: int):
+        self.stride = stride
+        self._ids: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def ids(self, sources, targets) -> np.ndarray:
+        codes = np.asarray(sources, dtype=np.int64) * self.stride + np.asarray(targets, dtype=np.int64)
+        unique, inverse = np.unique(codes, return_inverse=True)
+        known = self._ids
+        lane_ids = np.array([known.setdefault(code, len(known)) for code in unique.tolist()], dtype=np.intp)
+        return lane_ids[inverse].reshape(codes.shape)
+
+
+@dataclass
+class Lanes:
+    """Loads of several calculations summed per lane.
+
+    lanes gives the lane of every load, lengths and weights are per lane and shares is the
+    part of its lane's weight every load carries (equal parts on a lane without weight).
+    """
+    lanes: np.ndarray
+    lengths: np.ndarray
+    weights: np.ndarray
+    shares: np.ndarray
+
+    @classmethod
+    def consolidate(cls, sources, targets, lengths, weights, stride: int) -> "Lanes":
+        lanes = LaneIndex(stride).ids(sources, targets)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        count = int(lanes.max()) + 1 if lanes.size else 0
+        lane_weights = np.bincount(lanes, weights, minlength=count)
+        # All loads of a lane use the same route of the pair, so any of their lengths will do
+        lane_lengths = np.zeros(count)
+        lane_lengths[lanes] = lengths
+        loads = np.bincount(lanes, minlength=count)
+        total = lane_weights[lanes]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = np.where(total > 0, weights / total, 1.0 / loads[lanes])
+        return cls(lanes=lanes, lengths=lane_lengths, weights=lane_weights, shares=shares)
+
+    def spread_choice(self, chosen: np.ndarray, costs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Per load: load index, vehicle, share of the lane cost and weight left unassigned, from one choice per lane."""
+        units = chosen[self.lanes]
+        weights = self.shares * self.weights[self.lanes]
+        return np.arange(self.lanes.size), units, costs[self.lanes] * self.shares, np.where(units < 0, weights, 0.0)
+
+    def spread_plan(self, plan: FleetPlan) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Same as spread_choice for a plan packed over the lanes: a load gets an entry for every piece of its lane."""
+        starts = np.searchsorted(plan.routes, np.arange(self.lengths.size + 1))
+        first, counts = starts[self.lanes], np.diff(starts)[self.lanes]
+        loads = np.repeat(np.arange(self.lanes.size), counts)
+        pieces = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(loads.size)
+        units = plan.units[pieces]
+        shares = self.shares[loads]
+        return loads, units, plan.costs[pieces] * shares, np.where(units < 0, plan.weights[pieces] * shares, 0.0)
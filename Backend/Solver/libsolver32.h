@@ -80,6 +80,9 @@ extern "C" {
 #endif
 
 extern __declspec(dllexport) int* solveTransport(int* supplyPtr, int supplyLen, int* demandPtr, int demandLen, int* costPtr, int costRows, int costCols);
+extern __declspec(dllexport) void solveTransportInto(int* supplyPtr, int supplyLen, int* demandPtr, int demandLen, int* costPtr, int costRows, int costCols, int* outPtr);
+extern __declspec(dllexport) void solveTransportInto64(long long int* supplyPtr, int supplyLen, long long int* demandPtr, int demandLen, long long int* costPtr, int costRows, int costCols, long long int* outPtr);
+extern __declspec(dllexport) void solveTransportBatch(int* dataPtr, int dataLen, int* offsetsPtr, int count, int* outPtr, int outLen);
 extern __declspec(dllexport) void FreeResult(int* ptr);
 
 #ifdef __cplusplus
@@ -0,0 +1,222 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from Backend.Solver import numpy_solver
+
+
+class SpanningTreeBasis:
+    """Transportation basis kept as a spanning tree over rows (0..m-1) and columns (m..m+n-1)."""
+
+    def __init__(self, cost: np.ndarray, plan: np.ndarray, basis: np.ndarray):
+        self.cost = cost
+        self.plan = plan
+        self.m, self.n = cost.shape
+        self.adjacency: List[set] = [set() for _ in range(self.m + self.n)]
+        rows, cols = np.nonzero(basis)
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            self.adjacency[i].add(self.m + j)
+            self.adjacency[self.m + j].add(i)
+
+        self.parent: List[int] = [-1] * (self.m + self.n)
+        self.depth: List[int] = [0] * (self.m + self.n)
+        self.u = np.zeros(self.m, dtype=np.int64)
+        self.v = np.zeros(self.n, dtype=np.int64)
+        self._reduced = np.empty_like(cost)
+        for node in self._hang(0, -1)[1:]:
+            i, j = self.cell(node)
+            if node >= self.m:
+                self.v[j] = cost[i, j] - self.u[i]
+            else:
+                self.u[i] = cost[i, j] - self.v[j]
+
+    @classmethod
+    def from_cells(cls, cost: np.ndarray, supply: np.ndarray, demand: np.ndarray, cells: np.ndarray) -> Optional["SpanningTreeBasis"]:
+        """Rebuilds a previous basis ((row, column) pairs) for new supply and demand.
+
+        Returns None when the cells do not fit the problem or are not dual feasible for its cost.
+        """
+        m, n = cost.shape
+        cells = np.asarray(cells).reshape(-1, 2)
+        if cells.size and (cells[:, 0].max() >= m or cells[:, 1].max() >= n):
+            return None
+        basis = np.zeros((m, n), dtype=bool)
+        basis[cells[:, 0], cells[:, 1]] = True
+        if not numpy_solver.complete_basis(basis):
+            return None
+
+        tree = cls(cost, np.zeros((m, n), dtype=np.int64), basis)
+        if tree.entering_cell()[2] < 0:
+            return None
+        tree.assign_flows(supply, demand)
+        return tree
+
+    def cells(self) -> np.ndarray:
+        return np.array([self.cell(node) for node in range(1, self.m + self.n)], dtype=np.int32).reshape(-1, 2)
+
+    def assign_flows(self, supply: np.ndarray, demand: np.ndarray):
+        """Sets the unique tree flows for the given supply and demand; they may come out negative."""
+        net = np.concatenate([supply, -demand]).tolist()
+        self.plan[...] = 0
+        for node in reversed(self._hang(0, -1)[1:]):
+            self.plan[self.cell(node)] = net[node] if node < self.m else -net[node]
+            net[self.parent[node]] += net[node]
+
+    def _subtree(self, root: int) -> List[int]:
+        nodes = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(other for other in self.adjacency[node] if other != self.parent[node])
+        return nodes
+
+    def restore_feasibility(self) -> bool:
+        """Dual simplex pivots until no basic cell carries a negative amount; potentials stay dual feasible."""
+        m = self.m
+        nodes = np.arange(1, m + self.n)
+        while True:
+            parent = np.array(self.parent[1:])
+            rows = np.where(nodes < m, nodes, parent)
+            cols = np.where(nodes < m, parent, nodes) - m
+            flows = self.plan[rows, cols]
+            k = int(flows.argmin())
+            if flows[k] >= 0:
+                return True
+            leaving = int(nodes[k])
+
+            # Entering cell must cross the cut made by the leaving edge in the opposite direction
+            inside = np.zeros(m + self.n, dtype=bool)
+            inside[self._subtree(leaving)] = True
+            rows_inside, cols_inside = inside[:m], inside[m:]
+            if leaving < m:
+                crossing = (~rows_inside)[:, None] & cols_inside[None, :]
+            else:
+                crossing = rows_inside[:, None] & (~cols_inside)[None, :]
+            if not crossing.any():
+                return False
+
+            reduced = self.cost - self.u[:, None] - self.v[None, :]
+            reduced[~crossing] = np.iinfo(np.int64).max
+            k = int(reduced.argmin())
+            i0, j0 = divmod(k, self.n)
+            self.pivot(i0, j0, int(reduced.flat[k]), leaving)
+
+    def cell(self, node: int) -> Tuple[int, int]:
+        """Plan cell of the tree edge between node and its parent."""
+        up = self.parent[node]
+        if node >= self.m:
+            return up, node - self.m
+        return node, up - self.m
+
+    def _hang(self, root: int, parent: int) -> List[int]:
+        # Re-roots the component of root under parent and returns its nodes
+        self.parent[root] = parent
+        self.depth[root] = 0 if parent < 0 else self.depth[parent] + 1
+        nodes = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            for other in self.adjacency[node]:
+                if other != self.parent[node]:
+                    self.parent[other] = node
+                    self.depth[other] = self.depth[node] + 1
+                    stack.append(other)
+        return nodes
+
+    def entering_cell(self) -> Tuple[int, int, int]:
+        delta = np.subtract(self.cost, self.u[:, None], out=self._reduced)
+        delta -= self.v[None, :]
+        k = int(delta.argmin())
+        i, j = divmod(k, self.n)
+        return i, j, int(delta.flat[k])
+
+    def pivot(self, i0: int, j0: int, delta: int, leaving: Optional[int] = None):
+        parent, depth = self.parent, self.depth
+        a, b = i0, self.m + j0
+        row_side, column_side = [], []
+        while a != b:
+            if depth[a] >= depth[b]:
+                row_side.append(a)
+                a = parent[a]
+            else:
+                column_side.append(b)
+                b = parent[b]
+
+        # Edges next to the entering cell lose flow, signs alternate from there
+        losing = column_side[0::2] + row_side[0::2]
+        gaining = column_side[1::2] + row_side[1::2]
+        if leaving is None:
+            amounts = [self.plan[self.cell(node)] for node in losing]
+            theta = min(amounts)
+            leaving = losing[amounts.index(theta)]
+        else:
+            theta = -self.plan[self.cell(leaving)]
+
+        for node in losing:
+            self.plan[self.cell(node)] -= theta
+        for node in gaining:
+            self.plan[self.cell(node)] += theta
+        self.plan[i0, j0] += theta
+
+        up = parent[leaving]
+        self.adjacency[leaving].discard(up)
+        self.adjacency[up].discard(leaving)
+        self.adjacency[i0].add(self.m + j0)
+        self.adjacency[self.m + j0].add(i0)
+
+        # Only the subtree cut off by the leaving edge changes parents, depths and potentials
+        inner, outer = (i0, self.m + j0) if leaving in row_side else (self.m + j0, i0)
+        nodes = np.array(self._hang(inner, outer))
+        rows = nodes[nodes < self.m]
+        cols = nodes[nodes >= self.m] - self.m
+        if inner == i0:
+            self.u[rows] += delta
+            self.v[cols] -= delta
+        else:
+            self.v[cols] += delta
+            self.u[rows] -= delta
+
+    def optimize(self):
+        while True:
+            i0, j0, delta = self.entering_cell()
+            if delta >= 0:
+                break
+            self.pivot(i0, j0, delta)
+
+
+def solve_with_basis(supply, demand, cost, basis: Optional[np.ndarray] = None,
+                     out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Solves starting from a previous optimal basis for the same cost when one is given.
+
+    Returns the plan and the final basis as (row, column) pairs of the balanced problem.
+    """
+    sl, dl = len(supply), len(demand)
+    supply, demand, cost = numpy_solver.balance(supply, demand, cost)
+
+    tree = None
+    if basis is not None:
+        tree = SpanningTreeBasis.from_cells(cost, supply, demand, basis)
+        if tree is not None and not tree.restore_feasibility():
+            tree = None
+    if tree is None:
+        plan = numpy_solver.initial_plan(supply, demand, cost)
+        basis = plan > 0
+        if numpy_solver.complete_basis(basis):
+            tree = SpanningTreeBasis(cost, plan, basis)
+    else:
+        plan = tree.plan
+
+    if tree is not None:
+        tree.optimize()
+    result = tree.cells() if tree is not None else None
+
+    if out is None:
+        return plan[:sl, :dl], result
+    out[...] = plan[:sl, :dl]
+    return out, result
+
+
+def solve(supply, demand, cost, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return solve_with_basis(supply, demand, cost, out=out)[0]
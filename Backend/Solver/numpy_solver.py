@@ -0,0 +1,225 @@
+from collections import deque
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def balance(supply, demand, cost) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    supply = np.asarray(supply, dtype=np.int64).ravel()
+    demand = np.asarray(demand, dtype=np.int64).ravel()
+    cost = np.asarray(cost, dtype=np.int64).reshape(supply.size, demand.size)
+
+    diff = int(supply.sum() - demand.sum())
+    if diff < 0:
+        supply = np.append(supply, -diff)
+        cost = np.vstack([cost, np.zeros((1, demand.size), dtype=np.int64)])
+    elif diff > 0:
+        demand = np.append(demand, diff)
+        cost = np.hstack([cost, np.zeros((supply.size, 1), dtype=np.int64)])
+    return supply, demand, cost
+
+
+def initial_plan(supply: np.ndarray, demand: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    # Dual preference method, same order of passes as solveTransportDualPreference in solver.go
+    supply = supply.copy()
+    demand = demand.copy()
+    m, n = cost.shape
+    plan = np.zeros((m, n), dtype=np.int64)
+
+    row_min = cost.argmin(axis=1)
+    col_min = cost.argmin(axis=0)
+
+    # Cells that are minimal both in their row and in their column never share a row or column
+    rows = np.flatnonzero(col_min[row_min] == np.arange(m))
+    cols = row_min[rows]
+    q = np.minimum(supply[rows], demand[cols])
+    plan[rows, cols] = q
+    supply[rows] -= q
+    demand[cols] -= q
+
+    def ship(i, j):
+        q = min(supply[i], demand[j])
+        if q > 0:
+            plan[i, j] += q
+            supply[i] -= q
+            demand[j] -= q
+
+    for i in range(m):
+        if col_min[row_min[i]] != i:
+            ship(i, row_min[i])
+    for j in range(n):
+        if row_min[col_min[j]] != j:
+            ship(col_min[j], j)
+
+    # Minimal cost method for whatever is left
+    live = np.flatnonzero(((supply > 0)[:, None] & (demand > 0)[None, :]).ravel())
+    if live.size:
+        order = live[np.argsort(cost.ravel()[live], kind="stable")]
+        remaining = int(supply.sum())
+        for k in order.tolist():
+            if remaining == 0:
+                break
+            i, j = divmod(k, n)
+            q = min(supply[i], demand[j])
+            if q > 0:
+                plan[i, j] += q
+                supply[i] -= q
+                demand[j] -= q
+                remaining -= q
+    return plan
+
+
+def basis_tree(basis: np.ndarray) -> Tuple[List[int], List[int], List[int]]:
+    """BFS over the basis graph: rows are nodes 0..m-1, columns are nodes m..m+n-1."""
+    m, n = basis.shape
+    adjacency = [[] for _ in range(m + n)]
+    rows, cols = np.nonzero(basis)
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        adjacency[i].append(m + j)
+        adjacency[m + j].append(i)
+
+    parent = [-1] * (m + n)
+    depth = [-1] * (m + n)
+    order = [0]
+    depth[0] = 0
+    queue = deque(order)
+    while queue:
+        node = queue.popleft()
+        for other in adjacency[node]:
+            if depth[other] == -1:
+                parent[other] = node
+                depth[other] = depth[node] + 1
+                order.append(other)
+                queue.append(other)
+    return parent, depth, order
+
+
+class DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.rank = [0] * size
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> bool:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if self.rank[a] < self.rank[b]:
+            a, b = b, a
+        self.parent[b] = a
+        if self.rank[a] == self.rank[b]:
+            self.rank[a] += 1
+        return True
+
+
+def complete_basis(basis: np.ndarray) -> bool:
+    """Checks that the basic cells contain no cycle and joins them into a spanning tree.
+
+    Missing basic cells are added in place as zero-valued (epsilon) cells.
+    Returns False if the cells already close a cycle.
+    """
+    m, n = basis.shape
+    components = DisjointSet(m + n)
+    rows, cols = np.nonzero(basis)
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        if not components.union(i, m + j):
+            return False
+    if rows.size == m + n - 1:
+        return True
+
+    linked = cols[rows == 0]
+    if linked.size:
+        anchor = int(linked[0])
+    else:
+        anchor = 0
+        basis[0, anchor] = True
+        components.union(0, m + anchor)
+
+    for i in range(1, m):
+        if components.union(0, i):
+            basis[i, anchor] = True
+    for j in range(n):
+        if components.union(0, m + j):
+            basis[0, j] = True
+    return True
+
+
+def potentials(cost: np.ndarray, parent: List[int], order: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    m, n = cost.shape
+    u = np.zeros(m, dtype=np.int64)
+    v = np.zeros(n, dtype=np.int64)
+    for node in order[1:]:
+        up = parent[node]
+        if node >= m:
+            v[node - m] = cost[up, node - m] - u[up]
+        else:
+            u[node] = cost[node, up - m] - v[up - m]
+    return u, v
+
+
+def _tree_path(parent: List[int], depth: List[int], a: int, b: int) -> List[int]:
+    left, right = [a], [b]
+    while a != b:
+        if depth[a] >= depth[b]:
+            a = parent[a]
+            left.append(a)
+        else:
+            b = parent[b]
+            right.append(b)
+    return left + right[-2::-1]
+
+
+def build_cycle(parent: List[int], depth: List[int], m: int, i0: int, j0: int) -> List[Tuple[int, int]]:
+    # Entering cell first, then the tree path from column j0 back to row i0;
+    # even positions gain the shipped amount, odd positions lose it.
+    path = _tree_path(parent, depth, m + j0, i0)
+    cycle = [(i0, j0)]
+    for a, b in zip(path, path[1:]):
+        cycle.append((b, a - m) if a >= m else (a, b - m))
+    return cycle
+
+
+def optimize_by_potentials(cost: np.ndarray, plan: np.ndarray, basis: np.ndarray):
+    m, n = cost.shape
+    while True:
+        parent, depth, order = basis_tree(basis)
+        u, v = potentials(cost, parent, order)
+
+        delta = cost - u[:, None] - v[None, :]
+        delta[basis] = 0
+        k = int(delta.argmin())
+        if delta.flat[k] >= 0:
+            break
+        i0, j0 = divmod(k, n)
+
+        cycle = build_cycle(parent, depth, m, i0, j0)
+        losing = cycle[1::2]
+        amounts = [plan[c] for c in losing]
+        theta = min(amounts)
+        leaving = losing[amounts.index(theta)]
+
+        for c in cycle[0::2]:
+            plan[c] += theta
+        for c in losing:
+            plan[c] -= theta
+        basis[i0, j0] = True
+        basis[leaving] = False
+
+
+def solve(supply, demand, cost, out: Optional[np.ndarray] = None) -> np.ndarray:
+    sl, dl = len(supply), len(demand)
+    supply, demand, cost = balance(supply, demand, cost)
+    plan = initial_plan(supply, demand, cost)
+    basis = plan > 0
+    if complete_basis(basis):
+        optimize_by_potentials(cost, plan, basis)
+    if out is None:
+        return plan[:sl, :dl]
+    out[...] = plan[:sl, :dl]
+    return out
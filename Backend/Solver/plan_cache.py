@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+
+class PlanCache:
+    """Solved plans keyed by a hash of the canonicalized (supply, demand, cost) triple.
+
+    Entries are read-only copies, so every caller shares them safely. The least recently
+    used plans are evicted once their total size exceeds max_bytes; 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._plans: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(engine: Hashable, supply, demand, cost) -> Tuple:
+        supply = np.ascontiguousarray(supply, dtype=np.int64).ravel()
+        demand = np.ascontiguousarray(demand, dtype=np.int64).ravel()
+        cost = np.ascontiguousarray(cost, dtype=np.int64).reshape(supply.size, demand.size)
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (supply, demand, cost):
+            digest.update(array.data)
+        return engine, supply.size, demand.size, digest.digest()
+
+    def get(self, key: Tuple) -> Optional[np.ndarray]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._plans.move_to_end(key)
+            return plan
+
+    def put(self, key: Tuple, plan: np.ndarray) -> np.ndarray:
+        """Stores a read-only copy of plan and returns it."""
+        entry = np.array(plan, copy=True)
+        entry.setflags(write=False)
+        if entry.nbytes > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._plans.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self._plans[key] = entry
+            self.bytes += entry.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self._plans.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._plans),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def __len__(self):
+        return len(self._plans)
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+solver_processes = int(os.getenv("LTM_SOLVER_PROCESSES", "0")) or (os.cpu_count() or 1)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _initialize_worker():
+    # Imports the engines (and tries the native library) once per worker instead of on the first task
+    from Backend.Solver import calculation
+    calculation.load_native_library()
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def start_process_pool(processes: Optional[int] = None) -> ProcessPoolExecutor:
+    """Starts the solver worker processes; meant to be called once at app startup."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            count = processes or solver_processes
+            _pool = ProcessPoolExecutor(max_workers=count, mp_context=context, initializer=_initialize_worker)
+            for future in [_pool.submit(_warm_up) for _ in range(count)]:
+                future.result()
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def _solve_block(buffer, engine: str, data_size: int, out_size: int, block: Tuple[int, int, int, int]):
+    from Backend.Solver import calculation
+
+    base, rows, cols, out_base = block
+    data = np.ndarray((data_size,), dtype=np.intc, buffer=buffer)
+    out = np.ndarray((out_size,), dtype=np.intc, buffer=buffer, offset=data.nbytes)
+    supply = data[base:base + rows]
+    demand = data[base + rows:base + rows + cols]
+    cost = data[base + rows + cols:base + rows + cols + rows * cols].reshape(rows, cols)
+    plan = out[out_base:out_base + rows * cols].reshape(rows, cols)
+    calculation.ENGINES[engine](supply, demand, cost, out=plan)
+
+
+def _solve_shared(engine: str, name: str, data_size: int, out_size: int, block: Tuple[int, int, int, int]):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        _solve_block(shm.buf, engine, data_size, out_size, block)
+    except BaseException as error:
+        # Frames of a failed solve still hold array views of the block, which would make close() fail
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        shm.close()
+
+
+def process_solve_batch(engine: str, problems) -> List[np.ndarray]:
+    """Solves every problem in a worker process.
+
+    The packed problems and the output plans live in one shared memory block,
+    only the block name and the offsets row of each problem are pickled.
+    """
+    from Backend.Solver.calculation import pack_layout, pack_into, unpack_plans
+
+    pool = start_process_pool()
+    offsets, data_size, out_size = pack_layout(problems)
+    itemsize = np.dtype(np.intc).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max((data_size + out_size) * itemsize, 1))
+    data = out = None
+    try:
+        data = np.ndarray((data_size,), dtype=np.intc, buffer=shm.buf)
+        pack_into(problems, offsets, data)
+        out = np.ndarray((out_size,), dtype=np.intc, buffer=shm.buf, offset=data.nbytes)
+        out[:] = 0
+
+        blocks = [tuple(row) for row in offsets.tolist() if row[1] and row[2]]
+        blocks.sort(key=lambda block: block[1] * block[2], reverse=True)
+        futures = [pool.submit(_solve_shared, engine, shm.name, data_size, out_size, block) for block in blocks]
+        for future in futures:
+            future.result()
+
+        result = out.copy()
+    except BaseException as error:
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        data = out = None
+        shm.close()
+        shm.unlink()
+    return unpack_plans(result, offsets)
@@ -116,6 +116,13 @@ func min(a, b int) int {
 	return b
 }
 
+func max(a, b int) int {
+	if a > b {
+		return a
+	}
+	return b
+}
+
 func BalanceSupplyDemand(supply *[]int, demand *[]int, cost *[][]int) {
 	supplySum := 0
 	for _, s := range *supply {
@@ -152,33 +159,83 @@ type Point struct {
 	I, J int
 }
 
-func isValidBasis(plan [][]int) bool {
+type disjointSet struct {
+	parent []int
+	rank   []int
+}
+
+func newDisjointSet(size int) *disjointSet {
+	ds := &disjointSet{parent: make([]int, size), rank: make([]int, size)}
+	for i := range ds.parent {
+		ds.parent[i] = i
+	}
+	return ds
+}
+
+func (ds *disjointSet) find(x int) int {
+	for ds.parent[x] != x {
+		ds.parent[x] = ds.parent[ds.parent[x]]
+		x = ds.parent[x]
+	}
+	return x
+}
+
+func (ds *disjointSet) union(a, b int) bool {
+	a, b = ds.find(a), ds.find(b)
+	if a == b {
+		return false
+	}
+	if ds.rank[a] < ds.rank[b] {
+		a, b = b, a
+	}
+	ds.parent[b] = a
+	if ds.rank[a] == ds.rank[b] {
+		ds.rank[a]++
+	}
+	return true
+}
+
+// completeBasis проверяет, что базисные клетки не образуют цикл, и достраивает
+// их до остовного дерева нулевыми (-1) клетками.
+func completeBasis(plan [][]int) bool {
 	m := len(plan)
 	n := len(plan[0])
 
+	ds := newDisjointSet(m + n)
 	count := 0
+	anchor := -1
 	for i := 0; i < m; i++ {
 		for j := 0; j < n; j++ {
 			if plan[i][j] > 0 || plan[i][j] == -1 {
+				if !ds.union(i, m+j) {
+					return false
+				}
 				count++
+				if i == 0 && anchor == -1 {
+					anchor = j
+				}
 			}
 		}
 	}
-	if count != m+n-1 {
-		return false
+	if count == m+n-1 {
+		return true
 	}
 
-	for i := 0; i < m; i++ {
-		for j := 0; j < n; j++ {
-			if plan[i][j] > 0 || plan[i][j] == -1 {
-				cycle := buildCycle(plan, i, j)
-				if cycle != nil && len(cycle) > 0 {
-					return false
-				}
-			}
+	if anchor == -1 {
+		anchor = 0
+		plan[0][anchor] = -1
+		ds.union(0, m+anchor)
+	}
+	for i := 1; i < m; i++ {
+		if ds.union(0, i) {
+			plan[i][anchor] = -1
+		}
+	}
+	for j := 0; j < n; j++ {
+		if ds.union(0, m+j) {
+			plan[0][j] = -1
 		}
 	}
-
 	return true
 }
 
@@ -249,26 +306,31 @@ func optimizePlanByPotentials(cost [][]int, plan [][]int) {
 		}
 
 		minVal := math.MaxInt
+		leaving := -1
 		for k := 1; k < len(cycle); k += 2 {
 			i, j := cycle[k][0], cycle[k][1]
-			if plan[i][j] < minVal && plan[i][j] >= 0 {
-				minVal = plan[i][j]
+			if value := max(plan[i][j], 0); value < minVal {
+				minVal = value
+				leaving = k
 			}
 		}
 
+		// Из базиса выходит ровно одна клетка, остальные обнулившиеся остаются базисными (-1)
 		for k := 0; k < len(cycle); k++ {
 			i, j := cycle[k][0], cycle[k][1]
+			value := max(plan[i][j], 0)
 			if k%2 == 0 {
-				if plan[i][j] == -1 {
-					plan[i][j] = minVal
-				} else {
-					plan[i][j] += minVal
-				}
+				value += minVal
 			} else {
-				plan[i][j] -= minVal
-				if plan[i][j] == 0 {
-					plan[i][j] = -1
-				}
+				value -= minVal
+			}
+			switch {
+			case k == leaving:
+				plan[i][j] = 0
+			case value == 0:
+				plan[i][j] = -1
+			default:
+				plan[i][j] = value
 			}
 		}
 	}
@@ -281,65 +343,58 @@ func optimizePlanByPotentials(cost [][]int, plan [][]int) {
 	}
 }
 
+// buildCycle ищет цикл для клетки (startI, startJ). Базис - остовное дерево по строкам
+// и столбцам, поэтому цикл - это сама клетка и путь в дереве от строки startI к столбцу startJ.
 func buildCycle(plan [][]int, startI, startJ int) [][2]int {
 	m := len(plan)
 	n := len(plan[0])
 
-	type point struct{ i, j int }
-
-	basis := make(map[point]bool)
+	adjacency := make([][]int, m+n)
 	for i := 0; i < m; i++ {
 		for j := 0; j < n; j++ {
-			if plan[i][j] > 0 || plan[i][j] == -1 {
-				basis[point{i, j}] = true
+			if (plan[i][j] > 0 || plan[i][j] == -1) && (i != startI || j != startJ) {
+				adjacency[i] = append(adjacency[i], m+j)
+				adjacency[m+j] = append(adjacency[m+j], i)
 			}
 		}
 	}
-	basis[point{startI, startJ}] = true
 
-	var cycle [][2]int
-	visited := make(map[point]bool)
-
-	var dfs func(curr point, isRow bool) bool
-	dfs = func(curr point, isRow bool) bool {
-		if curr == (point{startI, startJ}) && len(cycle) >= 4 {
-			return true
-		}
-		if visited[curr] {
-			return false
-		}
-		visited[curr] = true
-		cycle = append(cycle, [2]int{curr.i, curr.j})
-
-		if isRow {
-			for col := 0; col < n; col++ {
-				p := point{curr.i, col}
-				if col != curr.j && basis[p] {
-					if dfs(p, !isRow) {
-						return true
-					}
-				}
-			}
-		} else {
-			for row := 0; row < m; row++ {
-				p := point{row, curr.j}
-				if row != curr.i && basis[p] {
-					if dfs(p, !isRow) {
-						return true
-					}
-				}
+	prev := make([]int, m+n)
+	for k := range prev {
+		prev[k] = -1
+	}
+	target := m + startJ
+	prev[startI] = startI
+	queue := []int{startI}
+	for len(queue) > 0 && prev[target] == -1 {
+		node := queue[0]
+		queue = queue[1:]
+		for _, next := range adjacency[node] {
+			if prev[next] == -1 {
+				prev[next] = node
+				queue = append(queue, next)
 			}
 		}
+	}
+	if prev[target] == -1 {
+		return nil
+	}
 
-		cycle = cycle[:len(cycle)-1]
-		visited[curr] = false
-		return false
+	path := []int{target}
+	for node := target; node != startI; node = prev[node] {
+		path = append(path, prev[node])
 	}
 
-	if dfs(point{startI, startJ}, true) {
-		return cycle
+	cycle := [][2]int{{startI, startJ}}
+	for k := len(path) - 1; k > 0; k-- {
+		a, b := path[k], path[k-1]
+		if a < m {
+			cycle = append(cycle, [2]int{a, b - m})
+		} else {
+			cycle = append(cycle, [2]int{b, a - m})
+		}
 	}
-	return nil
+	return cycle
 }
 
 func solve(supply []int, demand []int, cost [][]int) [][]int {
@@ -354,14 +409,22 @@ func solve(supply []int, demand []int, cost [][]int) [][]int {
 			}
 			print("\n")
 		}
-		fmt.Printf("valid basis - %t\n", isValidBasis(result))
+		fmt.Printf("valid basis - %t\n", completeBasis(result))
 	*/
-	if isValidBasis(result) {
+	if completeBasis(result) {
 		optimizePlanByPotentials(cost, result)
 	}
 	return result
 }
 
+// planCell - значение клетки плана для вызывающей стороны: эпсилон-клетки базиса (-1) перевозят ноль.
+func planCell(value int) int {
+	if value < 0 {
+		return 0
+	}
+	return value
+}
+
 //export solveTransport
 func solveTransport(supplyPtr *C.int, supplyLen C.int, demandPtr *C.int, demandLen C.int, costPtr *C.int, costRows, costCols C.int) *C.int {
 	supply := make([]int, int(supplyLen))
@@ -392,13 +455,107 @@ func solveTransport(supplyPtr *C.int, supplyLen C.int, demandPtr *C.int, demandL
 
 	for i := 0; i < len(supply); i++ {
 		for j := 0; j < len(demand); j++ {
-			outSlice[i*len(demand)+j] = C.int(plan[i][j])
+			outSlice[i*len(demand)+j] = C.int(planCell(plan[i][j]))
 		}
 	}
 
 	return out
 }
 
+type cInteger interface {
+	C.int | C.longlong
+}
+
+// solveInto читает задачу прямо из буферов вызывающей стороны и пишет план в outPtr (costRows x costCols).
+func solveInto[T cInteger](supplyPtr *T, supplyLen C.int, demandPtr *T, demandLen C.int, costPtr *T, costRows, costCols C.int, outPtr *T) {
+	rows, cols := int(costRows), int(costCols)
+	supplySlice := unsafe.Slice(supplyPtr, int(supplyLen))
+	demandSlice := unsafe.Slice(demandPtr, int(demandLen))
+	costSlice := unsafe.Slice(costPtr, rows*cols)
+
+	supply := make([]int, len(supplySlice))
+	for i, value := range supplySlice {
+		supply[i] = int(value)
+	}
+	demand := make([]int, len(demandSlice))
+	for j, value := range demandSlice {
+		demand[j] = int(value)
+	}
+	cost := make([][]int, rows)
+	for i := 0; i < rows; i++ {
+		cost[i] = make([]int, cols)
+		for j := 0; j < cols; j++ {
+			cost[i][j] = int(costSlice[i*cols+j])
+		}
+	}
+
+	plan := solve(supply, demand, cost)
+
+	out := unsafe.Slice(outPtr, rows*cols)
+	for i := 0; i < rows; i++ {
+		for j := 0; j < cols; j++ {
+			out[i*cols+j] = T(planCell(plan[i][j]))
+		}
+	}
+}
+
+//export solveTransportInto
+func solveTransportInto(supplyPtr *C.int, supplyLen C.int, demandPtr *C.int, demandLen C.int, costPtr *C.int, costRows, costCols C.int, outPtr *C.int) {
+	solveInto(supplyPtr, supplyLen, demandPtr, demandLen, costPtr, costRows, costCols, outPtr)
+}
+
+//export solveTransportInto64
+func solveTransportInto64(supplyPtr *C.longlong, supplyLen C.int, demandPtr *C.longlong, demandLen C.int, costPtr *C.longlong, costRows, costCols C.int, outPtr *C.longlong) {
+	solveInto(supplyPtr, supplyLen, demandPtr, demandLen, costPtr, costRows, costCols, outPtr)
+}
+
+// solveTransportBatch решает несколько задач за один вызов.
+// Для задачи k в offsets хранится четвёрка: смещение блока в data, число строк,
+// число столбцов и смещение плана в out. Блок в data - supply, demand и cost подряд.
+//
+//export solveTransportBatch
+func solveTransportBatch(dataPtr *C.int, dataLen C.int, offsetsPtr *C.int, count C.int, outPtr *C.int, outLen C.int) {
+	data := unsafe.Slice(dataPtr, int(dataLen))
+	offsets := unsafe.Slice(offsetsPtr, int(count)*4)
+	out := unsafe.Slice(outPtr, int(outLen))
+
+	for k := 0; k < int(count); k++ {
+		base := int(offsets[4*k])
+		rows := int(offsets[4*k+1])
+		cols := int(offsets[4*k+2])
+		outBase := int(offsets[4*k+3])
+		if rows == 0 || cols == 0 {
+			continue
+		}
+
+		supply := make([]int, rows)
+		demand := make([]int, cols)
+		cost := make([][]int, rows)
+		for i := 0; i < rows; i++ {
+			supply[i] = int(data[base+i])
+		}
+		base += rows
+		for j := 0; j < cols; j++ {
+			demand[j] = int(data[base+j])
+		}
+		base += cols
+		for i := 0; i < rows; i++ {
+			cost[i] = make([]int, cols)
+			for j := 0; j < cols; j++ {
+				cost[i][j] = int(data[base+i*cols+j])
+			}
+		}
+
+		plan := solve(supply, demand, cost)
+
+		for i := 0; i < rows; i++ {
+			for j := 0; j < cols; j++ {
+				out[outBase+i*cols+j] = C.int(planCell(plan[i][j]))
+			}
+		}
+	}
+}
+
 //export FreeResult
 func FreeResult(ptr *C.int) {
 	C.free(unsafe.Pointer(ptr))
@@ -422,7 +579,7 @@ func main() {
 
 	//cost1 := [][]int{{0, 20, 0}, {9, 0, 36}, {30, 0, 0}, {35, 20, 69}}
 
-	//fmt.Printf("test valid basis - %t\n", isValidBasis(cost1))
+	//fmt.Printf("test valid basis - %t\n", completeBasis(cost1))
 	fmt.Print("Done!")
 
 	/*
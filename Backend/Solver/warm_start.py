@@ -0,0 +1,46 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+
+
+class BasisStore:
+    """Optimal bases of earlier solves, kept per product and cost matrix.
+
+    A basis stays dual feasible as long as the cost matrix does not change, so it is a valid
+    starting point for the next solve of the same product when only quantities differ.
+    The least recently used entries are dropped once max_entries is reached.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._bases: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(product_key: Hashable, cost: np.ndarray) -> Tuple:
+        cost = np.ascontiguousarray(cost, dtype=np.int64)
+        return product_key, cost.shape, hashlib.blake2b(cost.tobytes(), digest_size=16).digest()
+
+    def get(self, key: Tuple) -> Optional[np.ndarray]:
+        with self._lock:
+            basis = self._bases.get(key)
+            if basis is not None:
+                self._bases.move_to_end(key)
+            return basis
+
+    def put(self, key: Tuple, basis: np.ndarray):
+        with self._lock:
+            self._bases[key] = basis
+            self._bases.move_to_end(key)
+            while len(self._bases) > self.max_entries:
+                self._bases.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._bases.clear()
+
+    def __len__(self):
+        return len(self._bases)
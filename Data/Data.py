@@ -1,11 +1,16 @@
 from typing import List, Dict, Optional, Tuple
+import atexit
 import json
+import threading
+import time
 from dataclasses import dataclass
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import DictCursor
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from Data.cache import TTLCache
 
 load_dotenv(dotenv_path='DB.env')  # Загружает переменные из DB.env
 
@@ -110,16 +115,193 @@ class MatrixEntry:
     point_id: int
     created_at: datetime
 
+@dataclass
+class LogisticsSnapshot:
+    products: List[Dict]
+    warehouses: List[Dict]  # with 'inventory': [{'product_name', 'quantity'}]
+    transports: List[Dict]
+    collection_points: List[Dict]
+
+class PoolTimeout(Exception):
+    pass
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections for one set of connection parameters.
+
+    min_size connections are opened up front and at most max_size exist at once; getconn
+    waits up to timeout seconds for one to be returned. A connection that sat idle for more
+    than check_after seconds is pinged before it is handed out, and broken ones are replaced.
+    putconn rolls back whatever the borrower left open.
+    """
+
+    def __init__(self, min_size: int = 1, max_size: int = 10, timeout: float = 30.0,
+                 check_after: float = 30.0, **connect_kwargs):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.connect_kwargs = connect_kwargs
+        self.pid = os.getpid()
+        self._idle: List[Tuple[object, float]] = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.connects = 0
+        self.discarded = 0
+        self.waits = 0
+        for _ in range(self.min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        conn.autocommit = False
+        with self._cond:
+            self.connects += 1
+        return conn
+
+    @staticmethod
+    def _alive(conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self.discarded += 1
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                self.waits += 1
+                left = deadline - time.monotonic()
+                if left <= 0 or not self._cond.wait(left):
+                    raise PoolTimeout(f"no database connection free after {self.timeout}s")
+            self.checkouts += 1
+            if self._idle:
+                conn, since = self._idle.pop()
+            else:
+                conn, since = None, 0.0
+                self._size += 1
+
+        # Checks and new connections happen outside the lock
+        try:
+            if conn is not None and (conn.closed or time.monotonic() - since > self.check_after) and not self._alive(conn):
+                self._discard(conn)
+                conn = None
+            return conn if conn is not None else self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn, close: bool = False):
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+        if close or conn.closed:
+            self._discard(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "discarded": self.discarded,
+                "waits": self.waits,
+            }
+
+# Пулы общие для всего процесса, по одному на набор параметров подключения.
+# Дочерние процессы заводят свои пулы: соединения нельзя делить между процессами.
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_CHECK_AFTER = float(os.getenv('DB_POOL_CHECK_AFTER', '30'))
+
+_pools: Dict[Tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(**connect_kwargs) -> ConnectionPool:
+    key = tuple(sorted((k, str(v)) for k, v in connect_kwargs.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_CHECK_AFTER, **connect_kwargs
+            )
+        return pool
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
+
+def _forget_pools():
+    # Соединения, унаследованные при fork, принадлежат родителю: закрытие из дочернего процесса
+    # оборвало бы их и у него, поэтому пулы просто забываются. Замок мог быть захвачен
+    # другим потоком в момент fork, его тоже заводим заново
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    _pools.clear()
+
+atexit.register(close_pools)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools)
+
+# Пользователи по user_id для flask-login: короткий TTL, сброс при выходе и удалении пользователя.
+# Сброс действует только в своём процессе: при нескольких воркерах удалённый пользователь
+# виден в остальных до истечения USER_CACHE_TTL, поэтому там его стоит держать коротким
+user_cache = TTLCache(int(os.getenv('USER_CACHE_SIZE', '1024')), float(os.getenv('USER_CACHE_TTL', '30')))
+
 class DatabaseManager:
-    def __init__(self, dbname, user, password, host='localhost', port='5432'):
-        self.conn = psycopg2.connect(
-            dbname=dbname,
-            user=user,
-            password=password,
-            host=host,
-            port=port
-        )
-        self.conn.autocommit = False
+    """Borrows a connection from the process-wide pool for its parameters (DB_POOL_MAX=0 connects directly).
+
+    Leaving the with block commits, or rolls back on an exception, and returns the connection.
+    """
+    def __init__(self, dbname, user, password, host='localhost', port='5432', pool: Optional[ConnectionPool] = None):
+        connect_kwargs = dict(dbname=dbname, user=user, password=password, host=host, port=port)
+        if pool is None and DB_POOL_MAX > 0:
+            pool = get_pool(**connect_kwargs)
+        self.pool = pool
+        if pool is not None:
+            self.conn = pool.getconn()
+        else:
+            self.conn = psycopg2.connect(**connect_kwargs)
+            self.conn.autocommit = False
         self.cursor = self.conn.cursor(cursor_factory=DictCursor)
     
     # Helper methods
@@ -162,6 +344,7 @@ class DatabaseManager:
     def delete_user(self, user_id: str) -> bool:
         query = "DELETE FROM users WHERE user_id = %s;"
         self.cursor.execute(query, (user_id,))
+        user_cache.invalidate(user_id)
         return self.cursor.rowcount > 0
     
     # Product CRUD methods
@@ -439,17 +622,77 @@ class DatabaseManager:
         self.cursor.execute(query, (entry_id,))
         return self.cursor.rowcount > 0
     
+    # Snapshot methods
+    def get_logistics_snapshot(self, user_id: str) -> LogisticsSnapshot:
+        """Products, warehouses with their inventory, transport and collection points of a user in one round trip."""
+        query = """
+        SELECT
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'product_id', p.product_id, 'name', p.name, 'weight', p.weight
+                    ) ORDER BY p.product_id), '[]'::json)
+             FROM products p
+             WHERE p.user_id = %(user_id)s) AS products,
+            (SELECT COALESCE(json_agg(w ORDER BY w.warehouse_id), '[]'::json)
+             FROM (
+                SELECT wh.warehouse_id, wh.name, wh.address,
+                       ST_Y(wh.coordinates::geometry) AS lat,
+                       ST_X(wh.coordinates::geometry) AS lon,
+                       COALESCE(json_agg(json_build_object(
+                           'product_name', p.name, 'quantity', si.quantity
+                       ) ORDER BY si.inventory_id) FILTER (WHERE p.product_id IS NOT NULL), '[]'::json) AS inventory
+                FROM warehouses wh
+                LEFT JOIN storage_inventory si ON si.warehouse_id = wh.warehouse_id
+                LEFT JOIN products p ON p.product_id = si.product_id
+                WHERE wh.user_id = %(user_id)s
+                GROUP BY wh.warehouse_id
+             ) w) AS warehouses,
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'name', t.name, 'capacity', t.weight_lift, 'fuel', t.fuel_consumption
+                    ) ORDER BY t.transport_id), '[]'::json)
+             FROM transport t
+             WHERE t.user_id = %(user_id)s) AS transports,
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'point_id', cp.point_id, 'name', cp.name, 'address', cp.address,
+                        'lat', ST_Y(cp.coordinates::geometry), 'lon', ST_X(cp.coordinates::geometry)
+                    ) ORDER BY cp.point_id), '[]'::json)
+             FROM collection_points cp
+             WHERE cp.user_id = %(user_id)s) AS collection_points;
+        """
+        result = self._execute_and_fetchone(query, {'user_id': user_id})
+        return LogisticsSnapshot(
+            products=result['products'],
+            warehouses=result['warehouses'],
+            transports=result['transports'],
+            collection_points=result['collection_points']
+        )
+
     # Context manager methods
     def __enter__(self):
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type is None:
-            self.conn.commit()
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        broken = False
+        try:
+            self.cursor.close()
+        except psycopg2.Error:
+            broken = True
+        if self.pool is not None:
+            # A connection that failed mid-commit is not trusted again
+            self.pool.putconn(conn, close=broken or conn.closed != 0)
         else:
-            self.conn.rollback()
-        self.cursor.close()
-        self.conn.close()
+            conn.close()
         
 # Пример создания и работы с таблицами
 """
@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TaskStore(ABC):
+    """State of one user's task (form data, computed routes) keyed by a task id.
+
+    States are JSON objects and are stored serialized, so a caller never shares a dict with
+    another request. Entries expire ttl seconds after their last write and at most
+    max_entries are kept, the least recently used are dropped first.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Dict]:
+        raw = self._load(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, state: Dict):
+        self._store(key, json.dumps(state, ensure_ascii=False))
+
+    def update(self, key: str, **fields) -> Dict:
+        """Merges fields into the stored state (an empty one if there is none) and returns it."""
+        state = self.get(key) or {}
+        state.update(fields)
+        self.set(key, state)
+        return state
+
+    @abstractmethod
+    def _load(self, key: str) -> Optional[str]:
+        """The serialized state of key, None if there is none or it has expired."""
+
+    @abstractmethod
+    def _store(self, key: str, raw: str):
+        """Stores the serialized state of key and restarts its ttl."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Drops the state of key, if any."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, float]:
+        """Backend name, entry count and size and the limits, for monitoring."""
+
+
+class MemoryTaskStore(TaskStore):
+    """Task states in this process only, for a single worker."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400.0):
+        super().__init__(max_entries, ttl)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _load(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key: str, raw: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, key: str, **fields) -> Dict:
+        # Under the lock, so concurrent updates of one task do not lose fields
+        with self._lock:
+            entry = self._entries.get(key)
+            state = json.loads(entry[1]) if entry is not None and entry[0] > time.monotonic() else {}
+            state.update(fields)
+            self._entries[key] = (time.monotonic() + self.ttl, json.dumps(state, ensure_ascii=False))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return state
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": sum(len(raw) for _, raw in self._entries.values()),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteTaskStore(TaskStore):
+    """Task states in a local SQLite file, shared by all worker processes on the host.
+
+    Every thread of every process opens its own connection; the database runs in WAL mode so
+    readers do not block the writer. Expired entries and those beyond max_entries are pruned
+    on write.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl: float = 86400.0):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS task_state_accessed ON task_state (accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so they are kept per process and thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _load(self, key: str) -> Optional[str]:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute("SELECT value FROM task_state WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE task_state SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _write(self, conn: sqlite3.Connection, key: str, raw: str):
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO task_state (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, raw, now + self.ttl, now)
+        )
+        conn.execute("DELETE FROM task_state WHERE expires <= ?", (now,))
+        conn.execute("""
+            DELETE FROM task_state WHERE key IN (
+                SELECT key FROM task_state ORDER BY accessed DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def _store(self, key: str, raw: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write(conn, key, raw)
+
+    def update(self, key: str, **fields) -> Dict:
+        # BEGIN IMMEDIATE takes the write lock before reading, so concurrent updates do not lose fields
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value FROM task_state WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+            state = json.loads(row[0]) if row is not None else {}
+            state.update(fields)
+            self._write(conn, key, json.dumps(state, ensure_ascii=False))
+        return state
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM task_state WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, float]:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM task_state WHERE expires > ?", (time.time(),)
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
+
+
+def make_task_store(spec: str = "memory", max_entries: int = 1024, ttl: float = 86400.0) -> TaskStore:
+    """Store for a spec, "memory" or "sqlite:<path>"."""
+    if spec.startswith("sqlite:"):
+        return SQLiteTaskStore(spec[len("sqlite:"):], max_entries, ttl)
+    if spec == "memory":
+        return MemoryTaskStore(max_entries, ttl)
+    raise ValueError(f"unknown task store {spec!r}, expected 'memory' or 'sqlite:<path>'")
@@ -1,7 +1,7 @@
 from datetime import timedelta
 import math
 import re
-from flask import Flask, json, request, jsonify, render_template, session
+from flask import Flask, Response, json, request, jsonify, render_template, session, stream_with_context
 from flask_cors import CORS
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 
@@ -9,12 +9,16 @@ import sys
 from pathlib import Path
 
 import os
+import uuid
 from dotenv import load_dotenv
 
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
-from Data.Data import DatabaseManager
+from Data.Data import DatabaseManager, user_cache
+from Data.task_store import make_task_store
+from Backend.Solver.process_pool import start_process_pool
+from Backend.Solver.jobs import JobManager, QueueFull
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.secret_key = b'_5#y2L"F4Q8z\n\xec]/'
@@ -30,6 +34,10 @@ app.config.update(
     PERMANENT_SESSION_LIFETIME=timedelta(days=1),
 )
 
+# Процессы решателя запускаются вместе с приложением, чтобы первый расчёт не ждал их старта
+if os.getenv('LTM_SOLVER_MODE') == 'process':
+    start_process_pool()
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'static_files'
@@ -39,14 +47,19 @@ class User(UserMixin):
         self.id = user_id
         self.username = username
 
-@login_manager.user_loader
-def load_user(user_id):
+def fetch_user(user_id):
+    # В кэш попадают только id и имя, хэш пароля в памяти не держим
     with DatabaseManager(**DB_CONFIG) as db:
         user_data = db.get_user_by_id(user_id)
-        if user_data:
-            return User(user_data.user_id, user_data.username)
+    if user_data:
+        return User(user_data.user_id, user_data.username)
     return None
 
+@login_manager.user_loader
+def load_user(user_id):
+    # Запрос к базе только при промахе кэша
+    return user_cache.get_or_load(user_id, lambda: fetch_user(user_id))
+
 load_dotenv(dotenv_path='C:\MAI\GitHub\LTManager\DB.env')  # Загружает переменные из DB.env
 
 DB_CONFIG = {
@@ -67,18 +80,41 @@ def index():
 def static_files(filename):
     return render_template(f'/{filename}')
 
-data_storage = {}
+# Данные задачи хранятся отдельно для каждой сессии. TASK_STORE=sqlite:<путь> делает хранилище общим
+# для всех процессов-воркеров на машине, по умолчанию оно в памяти процесса
+task_store = make_task_store(
+    os.getenv('TASK_STORE', 'memory'),
+    int(os.getenv('TASK_STORE_SIZE', '1024')),
+    float(os.getenv('TASK_STORE_TTL', str(24 * 60 * 60)))
+)
+
+# Фоновые расчёты маршрутов: LTM_JOB_WORKERS одновременно, не больше LTM_JOB_QUEUE ждут в очереди.
+# Задания живут в процессе, который их принял
+job_manager = JobManager(
+    int(os.getenv('LTM_JOB_WORKERS', '2')),
+    int(os.getenv('LTM_JOB_QUEUE', '16')),
+    keep_finished_s=float(os.getenv('LTM_JOB_KEEP', str(60 * 60)))
+)
+
+EMPTY_TASK = {
+    'trucks': [],
+    'warehouses': [],
+    'destinations': [],
+    'extraCosts': []
+}
+
+def task_id():
+    if 'task_id' not in session:
+        session['task_id'] = uuid.uuid4().hex
+    return session['task_id']
+
+def task_state():
+    return task_store.get(task_id()) or dict(EMPTY_TASK)
 
 @app.route('/validate', methods=['POST'])
 def validate_form():
     try:
-        global data_storage
-        data_storage = {
-            'trucks': [],
-            'warehouses': [],
-            'destinations': [],
-            'extraCosts': []
-        }
+        task_store.set(task_id(), EMPTY_TASK)
 
         data = request.get_json()
         
@@ -94,12 +130,12 @@ def validate_form():
         if not validate_unique_names(data):
             return jsonify({'success': False, 'message': 'Названия должны быть уникальными в пределах каждой формы'}), 400
         
-        data_storage = {
+        task_store.set(task_id(), {
             'trucks': data.get('trucks', []),
             'warehouses': data.get('warehouses', []),
             'destinations': data.get('destinations', []),
             'extraCosts': data.get('extraCosts', [])
-        }
+        })
         
         return jsonify({'success': True, 'redirect': '/itinerary.html'}), 200   
     
@@ -109,13 +145,13 @@ def validate_form():
 
 @app.route('/data')
 def get_data():
-    global data_storage
+    state = task_state()
 
     return jsonify({
-        'trucks': data_storage['trucks'],
-        'warehouses': data_storage['warehouses'],
-        'destinations': data_storage['destinations'],
-        'extraCosts': data_storage['extraCosts']
+        'trucks': state['trucks'],
+        'warehouses': state['warehouses'],
+        'destinations': state['destinations'],
+        'extraCosts': state['extraCosts']
     })
 
 
@@ -155,6 +191,7 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     return jsonify({'success': True})
 
@@ -195,77 +232,43 @@ def check_auth():
     return jsonify({'authenticated': False})
 
 
+@app.route('/api/cache-stats')
+@login_required
+def cache_stats():
+    return jsonify({'users': user_cache.stats(), 'tasks': task_store.stats(), 'jobs': job_manager.stats()})
+
+
 @app.route('/creating-task.html')
 @login_required
 def protected_creating_task():
     return render_template('creating-task.html')
 
 
+def warehouses_from_snapshot(snapshot):
+    return [{
+        'name': warehouse['name'],
+        'address': warehouse['address'],
+        'cargos': [{
+            'type': item['product_name'],
+            'quantity': item['quantity'],
+            'available': item['quantity']
+        } for item in warehouse['inventory']]
+    } for warehouse in snapshot.warehouses]
+
+
 @app.route('/get_db_data')
 @login_required
 def get_db_data():
     try:
         with DatabaseManager(**DB_CONFIG) as db:
-            # Получаем данные текущего пользователя
-            user_id = current_user.id
-            
-            # Получаем продукты пользователя
-            products = db._execute_and_fetchall("""
-                SELECT product_id, name, weight 
-                FROM products 
-                WHERE user_id = %s;
-            """, (user_id,))
-            
-            # Получаем склады пользователя
-            warehouses = db._execute_and_fetchall("""
-                SELECT warehouse_id, name, address, 
-                       ST_Y(coordinates::geometry) as lat, 
-                       ST_X(coordinates::geometry) as lon
-                FROM warehouses 
-                WHERE user_id = %s;
-            """, (user_id,))
-            
-            # Получаем инвентарь для каждого склада
-            warehouses_data = []
-            for warehouse in warehouses:
-                inventory = db._execute_and_fetchall("""
-                    SELECT p.name as product_name, si.quantity
-                    FROM storage_inventory si
-                    JOIN products p ON si.product_id = p.product_id
-                    WHERE si.warehouse_id = %s;
-                """, (warehouse['warehouse_id'],))
-                
-                warehouses_data.append({
-                    'name': warehouse['name'],
-                    'address': warehouse['address'],
-                    'cargos': [{
-                        'type': item['product_name'],
-                        'quantity': item['quantity'],
-                        'available': item['quantity']
-                    } for item in inventory]
-                })
-
-            # Получаем транспорт пользователя (если нужен)
-            transports = db._execute_and_fetchall("""
-                SELECT name, weight_lift as capacity, fuel_consumption as fuel
-                FROM transport 
-                WHERE user_id = %s;
-            """, (user_id,))
-
-            # Получаем пункты приема пользователя
-            collection_points = db._execute_and_fetchall("""
-                SELECT point_id, name, address, 
-                       ST_Y(coordinates::geometry) as lat, 
-                       ST_X(coordinates::geometry) as lon
-                FROM collection_points 
-                WHERE user_id = %s;
-            """, (user_id,))
-            
+            # Все данные пользователя (товары, склады с содержимым, транспорт, пункты приема) одним запросом
+            snapshot = db.get_logistics_snapshot(current_user.id)
+
             return jsonify({
-                'cargoTypes': [{'name': p['name'], 'weight': p['weight']} for p in products],
-                'truckTypes': [{'name': t['name'], 'capacity': t['capacity'], 'fuel': t['fuel']} for t in transports],
-                'warehouses': warehouses_data,
-                'destinations': [{'name': cp['name'], 'address': cp['address']} for cp in collection_points]
+                'cargoTypes': [{'name': p['name'], 'weight': p['weight']} for p in snapshot.products],
+                'truckTypes': [{'name': t['name'], 'capacity': t['capacity'], 'fuel': t['fuel']} for t in snapshot.transports],
+                'warehouses': warehouses_from_snapshot(snapshot),
+                'destinations': [{'name': cp['name'], 'address': cp['address']} for cp in snapshot.collection_points]
             })
             
     except Exception as e:
@@ -275,64 +278,27 @@ def get_db_data():
 @app.route('/api/logistics')
 @login_required
 def get_logistics_data():
-    global data_storage
-    # Если данные есть в памяти — вернуть их
-    if data_storage.get('warehouses') and data_storage.get('destinations'):
+    # Если данные задачи уже есть в хранилище — вернуть их
+    state = task_state()
+    if state.get('warehouses') and state.get('destinations'):
         return jsonify({
-            'warehouses': data_storage.get('warehouses', []),
-            'destinations': data_storage.get('destinations', [])
+            'warehouses': state.get('warehouses', []),
+            'destinations': state.get('destinations', [])
         })
 
     try:
         with DatabaseManager(**DB_CONFIG) as db:
-            user_id = current_user.id
-
-            # Получение складов
-            warehouses = db._execute_and_fetchall("""
-                SELECT warehouse_id, name, address,
-                       ST_Y(coordinates::geometry) AS lat,
-                       ST_X(coordinates::geometry) AS lon
-                FROM warehouses
-                WHERE user_id = %s;
-            """, (user_id,))
-
-            # Получение содержимого складов
-            warehouses_data = []
-            for warehouse in warehouses:
-                inventory = db._execute_and_fetchall("""
-                    SELECT p.name AS product_name, si.quantity
-                    FROM storage_inventory si
-                    JOIN products p ON si.product_id = p.product_id
-                    WHERE si.warehouse_id = %s;
-                """, (warehouse['warehouse_id'],))
-
-                warehouses_data.append({
-                    'name': warehouse['name'],
-                    'address': warehouse['address'],
-                    'cargos': [{
-                        'type': item['product_name'],
-                        'quantity': item['quantity'],
-                        'available': item['quantity']
-                    } for item in inventory]
-                })
-
-            # Получение пунктов приёма
-            destinations = db._execute_and_fetchall("""
-                SELECT name, address,
-                       ST_Y(coordinates::geometry) AS lat,
-                       ST_X(coordinates::geometry) AS lon
-                FROM collection_points
-                WHERE user_id = %s;
-            """, (user_id,))
+            # Склады с содержимым и пункты приёма одним запросом
+            snapshot = db.get_logistics_snapshot(current_user.id)
 
             destinations_data = [{
                 'name': dest['name'],
                 'address': dest['address'],
                 'cargos': []
-            } for dest in destinations]
+            } for dest in snapshot.collection_points]
 
             return jsonify({
-                'warehouses': warehouses_data,
+                'warehouses': warehouses_from_snapshot(snapshot),
                 'destinations': destinations_data
             })
     # в случае ошибки при получении данных из базы
@@ -342,6 +308,190 @@ def get_logistics_data():
 
 import logging
 logging.basicConfig(filename='app.log', level=logging.INFO, filemode='w')
+
+
+def compute_routes_response(state, routes_data, route_settings, report=lambda stage, progress: None):
+    """Ответ compute-routes для данных задачи state, маршрутов и настроек маршрута.
+
+    report(stage, progress) вызывается между этапами расчёта; задание, которое отменили, выбрасывает
+    из него исключение и расчёт прерывается. Внутри этапа отмена не проверяется: начатое решение
+    транспортных задач завершится, и только следующий report() остановит расчёт.
+    """
+    warehouses_data = state.get('warehouses', [])
+    destinations_data = state.get('destinations', [])
+    trucks_data = state.get('trucks', [])
+    logging.info("warehouses_data %s", warehouses_data)
+    logging.info("destinations_data %s", destinations_data)
+    logging.info("trucks_data %s", trucks_data)
+    trucks_data = [
+        {
+            **truck,
+            **({'capacity': str(float(truck.get('capacity', 0)) * 1000)} if len(truck['capacity']) != 0 else {}),
+            **({'fuel': str(float(truck['fuel']) / 100000)} if len(truck['fuel']) != 0 else {})
+        }
+        for truck in trucks_data
+    ]
+    extra_costs = state.get('extraCosts', [])
+    # logging.info("warehouses_data %s", warehouses_data)
+    # logging.info("destinations_data %s", destinations_data)
+    logging.info("trucks_data %s", trucks_data)
+    logging.info("extra_costs %s", extra_costs)
+
+    sum_extra_costs = sum(float(cost['value']) for cost in extra_costs if cost.get('value'))
+     # Получаем цену топлива из настроек (если есть) или используем значение по умолчанию 1.0
+    cost_per_distance = float(route_settings.get('fuelPrice', 0.0))
+    logging.info("cost_per_distance %s", cost_per_distance)
+
+    # Собираем задачу в виде массивов (склады, пункты приема, маршруты и транспорт) за один проход
+    from Backend.Solver.ClassBuilder import product_scope
+    from Backend.Solver.instance import ProblemInstance
+    from Backend.Solver.Formaters import instance_simple_formatter
+
+    # Товары, созданные во время запроса, живут только в его собственной области
+    report('building', 0.1)
+    with product_scope():
+        instance = ProblemInstance.from_json(warehouses_data, destinations_data, routes_data, trucks_data)
+        logging.info(
+            "instance: %s nodes, %s products, %s routes, %s transports",
+            instance.node_count, len(instance.product_names), instance.route_count, len(instance.transport_names)
+        )
+
+        # Вычисляем оптимальные маршруты и распределяем транспорт
+        report('solving', 0.3)
+        result = instance_simple_formatter(
+            instance,
+            additional_costs=0,
+            cost_per_distance=cost_per_distance,
+            # Товары на одной полосе склад -> пункт приема везет общий транспорт
+            consolidate=True
+        )
+
+    logging.info("result %s", result)
+    report('formatting', 0.9)
+    
+    # Подготавливаем данные для фронтенда
+    response_data = {
+        'success': True,
+        'message': 'Routes computed successfully',
+        'statistics': {
+            'path_length': 0,
+            'total_cost': 0,
+            'warehouses_count': 0,
+            'destinations_count': 0,
+            'truck_count': 0,
+            'extra_costs': float(sum_extra_costs),
+            'undelivered_weight': 0,
+            'unassigned_weight': 0
+        },
+        'complete': True,
+        'warnings': [],
+        'trucks': []
+    }
+
+    # Собираем уникальные склады, пункты назначения и машины
+    unique_warehouses = set()
+    unique_destinations = set()
+    unique_trucks = set()
+
+    # Цвета для разных машин
+    truck_colors = [
+        'islands#blueIcon', 
+        'islands#redIcon',
+        'islands#greenIcon',
+        'islands#yellowIcon',
+        'islands#violetIcon'
+    ]
+
+    if result:
+        for idx, (stats, transport_routes) in enumerate(result):
+            # Суммируем длины путей и затраты
+            response_data['statistics']['path_length'] += float(stats.get('length', 0))
+            response_data['statistics']['total_cost'] += float(stats.get('cost', 0))
+            if (math.isnan(response_data['statistics']['total_cost'])):
+                response_data['statistics']['total_cost'] = 0
+            # Груз, до которого нет ни одного маршрута
+            response_data['statistics']['undelivered_weight'] += float(stats.get('undelivered_weight', 0))
+            # Груз, который не поместился в ограниченный парк
+            response_data['statistics']['unassigned_weight'] += float(stats.get('unassigned_weight', 0))
+            logging.info("stats %s", stats)
+
+
+            # Собираем уникальные объекты
+            for truck_name, truck_data in transport_routes.items():
+                unique_trucks.add(truck_name)
+                
+                # Склады
+                for wh_name in truck_data.get('warehouses', {}).keys():
+                    unique_warehouses.add(wh_name)
+                
+                # Пункты назначения
+                for dest_name in truck_data.get('destinations', {}).keys():
+                    unique_destinations.add(dest_name)
+
+            # Создаем данные для машин
+            for truck_idx, (truck_name, truck_data) in enumerate(transport_routes.items()):
+                truck_info = {
+                    'name': str(truck_name),
+                    'color': truck_colors[truck_idx % len(truck_colors)],
+                    'routes': [],
+                    'warehouses': [],
+                    'destinations': []
+                }
+
+                # Обрабатываем маршруты
+                for route_key, route in truck_data.get('routes', {}).items():
+                    if isinstance(route_key, tuple):
+                        route_key = str(route_key)
+                    
+                    truck_info['routes'].append({
+                        'from': str(route.get('from', '')),
+                        'to': str(route.get('to', '')),
+                        'from_address': str(route.get('from_address', '')),
+                        'to_address': str(route.get('to_address', '')),
+                        'distance_m': float(route.get('distance_m', 0)),
+                        'path': [[float(coord[0]), float(coord[1])] for coord in route.get('path', [])]
+                    })
+
+                # Обрабатываем склады
+                for wh_name, wh_address in truck_data.get('warehouses', {}).items():
+                    truck_info['warehouses'].append({
+                        'name': str(wh_name),
+                        'address': str(wh_address)
+                    })
+
+                # Обрабатываем пункты назначения
+                for dest_name, dest_address in truck_data.get('destinations', {}).items():
+                    truck_info['destinations'].append({
+                        'name': str(dest_name),
+                        'address': str(dest_address)
+                    })
+
+                response_data['trucks'].append(truck_info)
+
+        # Устанавливаем количество уникальных объектов
+        response_data['statistics']['warehouses_count'] = len(unique_warehouses)
+        response_data['statistics']['destinations_count'] = len(unique_destinations)
+        response_data['statistics']['truck_count'] = len(unique_trucks)
+            
+        # logging.info("response_data['trucks'] %s", response_data['trucks'])
+
+    # Расчёт выполнен, но часть груза не доставлена: ответ помечается как неполный
+    if response_data['statistics']['undelivered_weight'] > 0:
+        response_data['complete'] = False
+        response_data['warnings'].append(
+            f"Нет маршрутов для {response_data['statistics']['undelivered_weight']:g} кг груза"
+        )
+    if response_data['statistics']['unassigned_weight'] > 0:
+        response_data['complete'] = False
+        response_data['warnings'].append(
+            f"Не хватает транспорта для {response_data['statistics']['unassigned_weight']:g} кг груза"
+        )
+    if not response_data['complete']:
+        response_data['message'] = 'Routes computed, part of the cargo is not delivered'
+
+    return response_data
+
+
 @app.route('/api/compute-routes', methods=['POST'])
 def compute_routes():
     try:
@@ -352,165 +502,11 @@ def compute_routes():
         # print("Received routes data:", routes_data)  # Для отладки
         logging.info("Received routes data: %s", routes_data)
         
-        # # Получаем данные из хранилища
-        global data_storage
-        warehouses_data = data_storage.get('warehouses', [])
-        destinations_data = data_storage.get('destinations', [])
-        trucks_data = data_storage.get('trucks', [])
-        logging.info("warehouses_data %s", warehouses_data)
-        logging.info("destinations_data %s", destinations_data)
-        logging.info("trucks_data %s", trucks_data)
-        trucks_data = [
-            {
-                **truck,
-                **({'capacity': str(float(truck.get('capacity', 0)) * 1000)} if len(truck['capacity']) != 0 else {}),
-                **({'fuel': str(float(truck['fuel']) / 100000)} if len(truck['fuel']) != 0 else {})
-            }
-            for truck in trucks_data
-        ]
-        extra_costs = data_storage.get('extraCosts', [])
-        # logging.info("warehouses_data %s", warehouses_data)
-        # logging.info("destinations_data %s", destinations_data)
-        logging.info("trucks_data %s", trucks_data)
-        logging.info("extra_costs %s", extra_costs)
-
-        sum_extra_costs = sum(float(cost['value']) for cost in extra_costs if cost.get('value'))
-         # Получаем цену топлива из настроек (если есть) или используем значение по умолчанию 1.0
         route_settings = json.loads(request.headers.get('Route-Settings', '{}'))
-        cost_per_distance = float(route_settings.get('fuelPrice', 0.0))
-        logging.info("cost_per_distance %s", cost_per_distance)
+        response_data = compute_routes_response(task_state(), routes_data, route_settings)
 
-        # Строим объекты складов и пунктов приема
-        from Backend.Solver.ClassBuilder import build_ProductStorage_from_json, build_Transport_from_json, build_Route_from_json
-        from Backend.Solver.Formaters import array_simple_formatter
-        
-        # Создаем объекты складов
-        warehouses = build_ProductStorage_from_json(warehouses_data)
-        logging.info("warehouses %s", warehouses)
-        
-        # Создаем объекты пунктов приема (используем ту же функцию, так как структура похожа)
-        destinations = build_ProductStorage_from_json(destinations_data)
-        logging.info("destinations %s", destinations)
-        
-        # Создаем объекты маршрутов
-        routes = build_Route_from_json(routes_data, warehouses + destinations)
-        # logging.info("routes %s", routes)
-        
-        # Создаем объекты транспорта
-        transports = build_Transport_from_json(trucks_data)
-        logging.info("transports %s", transports)
-        
-        # Вычисляем оптимальные маршруты и распределяем транспорт
-        result = array_simple_formatter(
-            storages=warehouses,
-            routes=routes,
-            transports=transports,
-            additional_costs=0,
-            cost_per_distance=cost_per_distance
-        )
-
-        logging.info("result %s", result)
-        
-        # Подготавливаем данные для фронтенда
-        response_data = {
-            'success': True,
-            'message': 'Routes computed successfully',
-            'statistics': {
-                'path_length': 0,
-                'total_cost': 0,
-                'warehouses_count': 0,
-                'destinations_count': 0,
-                'truck_count': 0,
-                'extra_costs': float(sum_extra_costs)
-            },
-            'trucks': []
-        }
-
-        # Собираем уникальные склады, пункты назначения и машины
-        unique_warehouses = set()
-        unique_destinations = set()
-        unique_trucks = set()
-
-        # Цвета для разных машин
-        truck_colors = [
-            'islands#blueIcon', 
-            'islands#redIcon',
-            'islands#greenIcon',
-            'islands#yellowIcon',
-            'islands#violetIcon'
-        ]
-
-        if result:
-            for idx, (stats, transport_routes) in enumerate(result):
-                # Суммируем длины путей и затраты
-                response_data['statistics']['path_length'] += float(stats.get('length', 0))
-                response_data['statistics']['total_cost'] += float(stats.get('cost', 0))
-                if (math.isnan(response_data['statistics']['total_cost'])):
-                    response_data['statistics']['total_cost'] = 0
-                logging.info("stats %s", stats)
-
-
-                # Собираем уникальные объекты
-                for truck_name, truck_data in transport_routes.items():
-                    unique_trucks.add(truck_name)
-                    
-                    # Склады
-                    for wh_name in truck_data.get('warehouses', {}).keys():
-                        unique_warehouses.add(wh_name)
-                    
-                    # Пункты назначения
-                    for dest_name in truck_data.get('destinations', {}).keys():
-                        unique_destinations.add(dest_name)
-
-                # Создаем данные для машин
-                for truck_idx, (truck_name, truck_data) in enumerate(transport_routes.items()):
-                    truck_info = {
-                        'name': str(truck_name),
-                        'color': truck_colors[truck_idx % len(truck_colors)],
-                        'routes': [],
-                        'warehouses': [],
-                        'destinations': []
-                    }
-
-                    # Обрабатываем маршруты
-                    for route_key, route in truck_data.get('routes', {}).items():
-                        if isinstance(route_key, tuple):
-                            route_key = str(route_key)
-                        
-                        truck_info['routes'].append({
-                            'from': str(route.get('from', '')),
-                            'to': str(route.get('to', '')),
-                            'from_address': str(route.get('from_address', '')),
-                            'to_address': str(route.get('to_address', '')),
-                            'distance_m': float(route.get('distance_m', 0)),
-                            'path': [[float(coord[0]), float(coord[1])] for coord in route.get('path', [])]
-                        })
-
-                    # Обрабатываем склады
-                    for wh_name, wh_address in truck_data.get('warehouses', {}).items():
-                        truck_info['warehouses'].append({
-                            'name': str(wh_name),
-                            'address': str(wh_address)
-                        })
-
-                    # Обрабатываем пункты назначения
-                    for dest_name, dest_address in truck_data.get('destinations', {}).items():
-                        truck_info['destinations'].append({
-                            'name': str(dest_name),
-                            'address': str(dest_address)
-                        })
-
-                    response_data['trucks'].append(truck_info)
-
-            # Устанавливаем количество уникальных объектов
-            response_data['statistics']['warehouses_count'] = len(unique_warehouses)
-            response_data['statistics']['destinations_count'] = len(unique_destinations)
-            response_data['statistics']['truck_count'] = len(unique_trucks)
-                
-            # logging.info("response_data['trucks'] %s", response_data['trucks'])
-
-        # Обновляем глобальное хранилище
-        data_storage['computed_routes'] = [response_data]
+        # Сохраняем результат в данных задачи
+        task_store.update(task_id(), computed_routes=[response_data])
         # logging.info("response_data['statistics'] %s", response_data['statistics'])
 
         logging.info("response_data %s", response_data)
@@ -521,6 +517,99 @@ def compute_routes():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+def run_compute_routes_job(job, owner, state, routes_data, route_settings):
+    response_data = compute_routes_response(state, routes_data, route_settings, report=job.report)
+    # Результат сохраняется в задаче, которая отправила расчёт, даже если сессия уже сменилась
+    task_store.update(owner, computed_routes=[response_data])
+    logging.info("job %s finished in %s", job.id, job.timing())
+    return response_data
+
+
+def job_urls(job):
+    return {
+        'status_url': f'/api/jobs/{job.id}',
+        'stream_url': f'/api/jobs/{job.id}/stream'
+    }
+
+
+@app.route('/api/jobs/compute-routes', methods=['POST'])
+def submit_compute_routes():
+    routes_data = request.get_json()
+    if not routes_data:
+        return jsonify({'success': False, 'message': 'No data provided'}), 400
+
+    route_settings = json.loads(request.headers.get('Route-Settings', '{}'))
+    owner = task_id()
+    try:
+        # Данные задачи берутся на момент отправки, чтобы расчёт не зависел от следующих изменений формы
+        job = job_manager.submit(run_compute_routes_job, owner, task_state(), routes_data, route_settings, owner=owner)
+    except QueueFull as e:
+        response = jsonify({'success': False, 'message': f'Сервер занят: {e}', 'jobs': job_manager.stats()})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+
+    response = jsonify({'success': True, **job.to_dict(), **job_urls(job)})
+    response.headers['Location'] = job_urls(job)['status_url']
+    return response, 202
+
+
+def query_arg(name, default, kind):
+    """Параметр запроса name типа kind, default если его нет и None если он не разбирается"""
+    if name not in request.args:
+        return default
+    return request.args.get(name, type=kind)
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id, owner=task_id())
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    # ?wait=<секунды> держит запрос, пока задание не изменится (long polling)
+    wait = query_arg('wait', 0.0, float)
+    version = query_arg('version', job.version, int)
+    if wait is None or not math.isfinite(wait) or version is None:
+        return jsonify({'success': False, 'message': 'wait must be a number of seconds and version an integer'}), 400
+    wait = min(wait, 30.0)
+    if wait > 0 and not job.finished:
+        job_manager.wait(job, version, wait)
+    return jsonify({'success': True, **job.to_dict(), **job_urls(job)})
+
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    job = job_manager.get(job_id, owner=task_id())
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+    def events():
+        version = -1
+        while True:
+            if job.version == version:
+                # Пустой комментарий раз в 15 секунд не дает прокси закрыть соединение
+                if not job_manager.wait(job, version, 15.0):
+                    yield ': keep-alive\n\n'
+                    continue
+            version = job.version
+            data = job.to_dict()
+            yield f'event: {data["status"]}\nid: {version}\ndata: {json.dumps(data)}\n\n'
+            if job.finished:
+                return
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id, owner=task_id())
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    # Отмена кооперативная: задание в очереди снимается сразу, а выполняющийся расчёт проверяет её
+    # только в report() между этапами, поэтому идущий этап (например, само решение) доводится до конца
+    return jsonify({'success': True, **job.to_dict(include_result=False)}), 202 if not job.finished else 200
+
+
 @app.route('/api/save-routes', methods=['POST'])
 def save_routes():  
     return jsonify({'success': True, 'message': 'Routes saved successfully'}), 200
@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# Every solve must reach its engine, a plan cached from another engine would hide a disagreement
+os.environ.setdefault("LTM_PLAN_CACHE_BYTES", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,109 @@
+import pytest
+
+from Data import Data, cache
+from Data.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+class FakeCursor:
+    rowcount = 1
+
+    def execute(self, query, params=None):
+        self.query = query
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    closed = 0
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+
+class FakePool:
+    def getconn(self):
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+def test_get_or_load_loads_once():
+    users = TTLCache(4, 60)
+    calls = []
+    for _ in range(3):
+        assert users.get_or_load("a", lambda: calls.append(1) or "A") == "A"
+    assert len(calls) == 1
+    assert users.stats()["hits"] == 2
+
+
+def test_missing_value_is_not_cached():
+    users = TTLCache(4, 60)
+    assert users.get_or_load("a", lambda: None) is None
+    assert len(users) == 0
+
+
+def test_entries_expire(clock):
+    users = TTLCache(4, 30)
+    users.put("a", "A")
+    clock.now = 29.0
+    assert users.get("a") == "A"
+    clock.now = 30.0
+    assert users.get("a") is None
+    assert users.stats()["expirations"] == 1
+
+
+def test_least_recently_used_goes_first():
+    users = TTLCache(2, 60)
+    users.put("a", "A")
+    users.put("b", "B")
+    users.get("a")
+    users.put("c", "C")
+    assert users.get("b") is None
+    assert users.get("a") == "A"
+    assert users.stats()["evictions"] == 1
+
+
+def test_int_and_str_keys_are_the_same_entry():
+    # flask-login passes the id as str, current_user.id and the database give an int
+    users = TTLCache(4, 60)
+    users.put("7", "A")
+    assert users.get(7) == "A"
+    users.invalidate(7)
+    assert users.get("7") is None
+    assert users.stats()["invalidations"] == 1
+
+
+@pytest.mark.parametrize("size, ttl", [(0, 60), (4, 0)])
+def test_zero_size_or_ttl_disables_cache(size, ttl):
+    users = TTLCache(size, ttl)
+    users.put("a", "A")
+    assert users.get("a") is None
+
+
+def test_delete_user_evicts_cached_user(monkeypatch):
+    users = TTLCache(4, 60)
+    monkeypatch.setattr(Data, "user_cache", users)
+    users.get_or_load("7", lambda: "A")
+    with Data.DatabaseManager("db", "user", "password", pool=FakePool()) as db:
+        assert db.delete_user(7)
+    assert users.get("7") is None
@@ -0,0 +1,36 @@
+from Backend.Solver.ClassBuilder import ProductRegistry, build_ProductStorage_from_json, default_registry, product_scope
+
+
+def storages(weight):
+    return [{"name": "W1", "address": "a1", "cargos": [{"type": "A", "weight": weight, "quantity": 1}]}]
+
+
+def products(built):
+    return [product for storage in built for product in storage.stored_products]
+
+
+def test_unscoped_builds_follow_weight_changes():
+    [light] = products(build_ProductStorage_from_json(storages("1")))
+    [same] = products(build_ProductStorage_from_json(storages("1")))
+    [heavy] = products(build_ProductStorage_from_json(storages("2")))
+    assert same is light
+    assert heavy.weight == 2.0
+    assert default_registry.get_or_create("A", "2") is heavy
+
+
+def test_scope_keeps_the_first_weight():
+    with product_scope() as registry:
+        [first] = products(build_ProductStorage_from_json(storages("1")))
+        [again] = products(build_ProductStorage_from_json(storages("2")))
+    assert again is first
+    assert len(registry) == 1
+
+
+def test_bounded_registry_drops_least_recently_used():
+    registry = ProductRegistry(max_size=2)
+    a = registry.get_or_create("A", "1")
+    registry.get_or_create("B", "1")
+    registry.get_or_create("A", "1")
+    registry.get_or_create("C", "1")
+    assert registry.get_or_create("A", "1") is a
+    assert len(registry) == 2
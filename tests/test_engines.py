@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from Backend.Solver import calculation
+
+
+def random_problems(seed, count=60):
+    rng = np.random.default_rng(seed)
+    problems = []
+    for _ in range(count):
+        rows, cols = rng.integers(1, 8, 2)
+        supply = rng.integers(0, 20, rows)
+        demand = rng.integers(0, 20, cols)
+        if rng.random() < 0.5:
+            # Balanced and degenerate: the whole supply goes to the first receiver
+            demand[:] = 0
+            demand[0] = supply.sum()
+        cost = rng.integers(1, 50, (rows, cols))
+        problems.append((supply, demand, cost))
+    return problems
+
+
+def engines():
+    names = ["numpy", "simplex"]
+    if calculation.load_native_library() is not None:
+        names.append("native")
+    return names
+
+
+def plan_cost(plan, cost):
+    return int((np.asarray(plan) * cost).sum())
+
+
+def check_plan(plan, supply, demand):
+    plan = np.asarray(plan)
+    assert (plan >= 0).all()
+    assert (plan.sum(axis=1) <= supply).all()
+    assert (plan.sum(axis=0) <= demand).all()
+    assert plan.sum() == min(supply.sum(), demand.sum())
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_engines_agree_on_optimal_cost(seed):
+    for supply, demand, cost in random_problems(seed):
+        costs = {}
+        for name in engines():
+            plan = calculation.ENGINES[name](supply, demand, cost)
+            check_plan(plan, supply, demand)
+            costs[name] = plan_cost(plan, cost)
+        assert len(set(costs.values())) == 1, costs
+
+
+@pytest.mark.parametrize("mode", calculation.SOLVE_MODES[:2])
+def test_solve_batch_matches_single_solves(mode):
+    problems = random_problems(3, 20)
+    for name in engines():
+        plans = calculation.solve_batch(problems, engine=name, mode=mode)
+        for plan, (supply, demand, cost) in zip(plans, problems):
+            check_plan(plan, supply, demand)
+            assert plan_cost(plan, cost) == plan_cost(calculation.ENGINES["simplex"](supply, demand, cost), cost)
+
+
+def brute_force_cost(supply, demand, cost):
+    """Cheapest plan shipping min(total supply, total demand), by trying every integer plan."""
+    rows, cols = cost.shape
+    total = min(supply.sum(), demand.sum())
+    best = None
+
+    def place(cell, left, shipped, spent):
+        nonlocal best
+        if cell == rows * cols:
+            if shipped == total and (best is None or spent < best):
+                best = spent
+            return
+        i, j = divmod(cell, cols)
+        for amount in range(min(left[i], left[rows + j]) + 1):
+            left[i] -= amount
+            left[rows + j] -= amount
+            place(cell + 1, left, shipped + amount, spent + amount * int(cost[i, j]))
+            left[i] += amount
+            left[rows + j] += amount
+
+    place(0, list(supply) + list(demand), 0, 0)
+    return best
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_engines_reach_brute_force_optimum(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(40):
+        rows, cols = rng.integers(1, 4, 2)
+        supply, demand = rng.integers(0, 5, rows), rng.integers(0, 5, cols)
+        cost = rng.integers(1, 20, (rows, cols))
+        best = brute_force_cost(supply, demand, cost)
+        for name in engines():
+            assert plan_cost(calculation.ENGINES[name](supply, demand, cost), cost) == best, name
+
+
+@pytest.mark.parametrize("seed", [4, 5])
+def test_engines_reach_linear_programming_optimum(seed):
+    optimize = pytest.importorskip("scipy.optimize")
+    for supply, demand, cost in random_problems(seed, 30):
+        rows, cols = cost.shape
+        # The constraint matrix is totally unimodular, so the LP optimum is the integer one
+        bounds = np.vstack([np.kron(np.eye(rows), np.ones(cols)), np.kron(np.ones(rows), np.eye(cols))])
+        result = optimize.linprog(
+            cost.ravel(), A_ub=bounds, b_ub=np.concatenate([supply, demand]),
+            A_eq=np.ones((1, rows * cols)), b_eq=[min(supply.sum(), demand.sum())], method="highs"
+        )
+        assert result.status == 0
+        for name in engines():
+            assert plan_cost(calculation.ENGINES[name](supply, demand, cost), cost) == round(result.fun), name
@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+import pytest
+
+from Backend.Solver.fleet import FleetFrontier, FleetPacker, fleet_limits_from_json
+
+
+def random_loads(seed, count):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1000, 50000, count).astype(float)
+    weights = rng.integers(100, 20000, count).astype(float)
+    capacities = rng.integers(2000, 12000, 8).astype(float)
+    fuel_costs = rng.uniform(0.5, 2.0, 8)
+    return rng, lengths, weights, capacities, fuel_costs
+
+
+def check_plan(packer, plan, lengths, weights):
+    """Weight is conserved and no vehicle breaks its type's count, shift or trip limit."""
+    carried = np.zeros(lengths.size)
+    np.add.at(carried, plan.routes, plan.weights)
+    assert np.allclose(carried, weights)
+    assigned = plan.units >= 0
+    types = plan.unit_types[plan.units[assigned]]
+    trips = np.maximum(np.ceil(plan.weights[assigned] / packer.capacities[types]), 1)
+    assert (plan.trips[assigned] == trips).all()
+    shifts = np.zeros(plan.unit_types.size)
+    np.add.at(shifts, plan.units[assigned], lengths[plan.routes[assigned]] * trips)
+    assert np.allclose(shifts, plan.unit_shifts)
+    assert (shifts <= packer.shift_limits[plan.unit_types] + 1e-6).all()
+    unit_trips = np.zeros(plan.unit_types.size)
+    np.add.at(unit_trips, plan.units[assigned], trips)
+    assert (unit_trips <= packer.trip_limits[plan.unit_types]).all()
+    opened = np.bincount(plan.unit_types, minlength=packer.capacities.size)
+    assert ((packer.counts < 0) | (opened <= packer.counts)).all()
+
+
+def test_unlimited_fleet_matches_frontier():
+    _, lengths, weights, capacities, fuel_costs = random_loads(0, 500)
+    packer = FleetPacker(capacities, fuel_costs)
+    plan = packer.pack(lengths, weights)
+    check_plan(packer, plan, lengths, weights)
+    _, costs = FleetFrontier(capacities, fuel_costs).assign(lengths, weights)
+    assert plan.costs.sum() == pytest.approx(costs.sum())
+    assert plan.unassigned_weight == 0
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_packer_respects_count_and_shift(seed):
+    rng, lengths, weights, capacities, fuel_costs = random_loads(seed, 1000)
+    counts = rng.integers(1, 30, 8)
+    shifts = rng.uniform(0.5e6, 1.5e6, 8)
+    packer = FleetPacker(capacities, fuel_costs, counts, shifts)
+    plan = packer.pack(lengths, weights)
+    check_plan(packer, plan, lengths, weights)
+
+
+def test_count_without_shift_limits_the_fleet():
+    # Two vehicles taking a single trip each: three of the five loads stay unassigned
+    packer = FleetPacker([10.0], [1.0], counts=[2])
+    plan = packer.pack(np.full(5, 10.0), np.full(5, 8.0))
+    check_plan(packer, plan, np.full(5, 10.0), np.full(5, 8.0))
+    assert plan.unit_types.size == 2
+    assert plan.unassigned_weight == 24
+
+
+def test_count_without_shift_overflows_to_other_types():
+    packer = FleetPacker([10.0, 20.0], [1.0, 5.0], counts=[2, -1])
+    plan = packer.pack(np.full(5, 10.0), np.full(5, 8.0))
+    assert plan.unassigned_weight == 0
+    assert np.bincount(plan.unit_types).tolist() == [2, 1]
+
+
+def test_trip_limit_bounds_each_vehicle():
+    packer = FleetPacker([10.0], [1.0], counts=[2], trip_limits=[2])
+    lengths, weights = np.full(5, 10.0), np.full(5, 8.0)
+    plan = packer.pack(lengths, weights)
+    check_plan(packer, plan, lengths, weights)
+    assert plan.unassigned_weight == 8
+
+
+def test_fleet_limits_from_json():
+    assert fleet_limits_from_json({"count": "3", "shift": "2", "trips": "4"}, 1000) == (3, 2000.0, 4.0)
+    assert fleet_limits_from_json({"count": "", "shift": "x"}) == (-1, np.inf, np.inf)
+
+
+def test_packing_thousands_of_loads_stays_fast():
+    # 200 types limited by count only: every vehicle makes one trip, so there are about as many
+    # vehicles as loads. Quadratic searches over them took seconds here.
+    rng, lengths, weights, _, _ = random_loads(0, 3000)
+    capacities = rng.integers(2000, 12000, 200).astype(float)
+    fuel_costs = rng.uniform(0.5, 2.0, 200)
+    packer = FleetPacker(capacities, fuel_costs, rng.integers(1, 30, 200))
+    started = time.perf_counter()
+    plan = packer.pack(lengths, weights)
+    assert time.perf_counter() - started < 1.5
+    check_plan(packer, plan, lengths, weights)
@@ -0,0 +1,92 @@
+import importlib
+import os
+import threading
+
+import pytest
+
+from Backend.Solver.jobs import CANCELLED, DONE, JobManager
+
+WAREHOUSES = [{"name": "W1", "address": "a1", "cargos": [{"type": "A", "weight": "1", "quantity": 10}]}]
+RECEIVERS = [{"name": "D1", "address": "b1", "cargos": [{"type": "A", "weight": "1", "quantity": 10}]}]
+ROUTES = [{"from": "W1", "from_address": "a1", "to": "D1", "to_address": "b1", "distance_m": 100, "path": []}]
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # The app logs to app.log in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        yield importlib.import_module("Frontend.app")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session["task_id"] = "test-task"
+    app_module.task_store.set("test-task", {
+        "warehouses": WAREHOUSES, "destinations": RECEIVERS,
+        "trucks": [{"name": "T", "capacity": "100", "fuel": "1"}], "extraCosts": []
+    })
+    return client
+
+
+def submit(client):
+    response = client.post("/api/jobs/compute-routes", json=ROUTES)
+    assert response.status_code == 202
+    return response.get_json()["job_id"]
+
+
+def test_job_runs_to_completion(client):
+    job_id = submit(client)
+    data = client.get(f"/api/jobs/{job_id}?wait=10").get_json()
+    for _ in range(10):
+        if data["status"] == DONE:
+            break
+        data = client.get(f"/api/jobs/{job_id}?wait=10&version={data['version']}").get_json()
+    assert data["status"] == DONE
+    assert data["result"]["complete"]
+    assert data["result"]["statistics"]["undelivered_weight"] == 0
+
+
+@pytest.mark.parametrize("query", ["wait=abc", "wait=nan", "wait=inf", "version=x", "version=1.5"])
+def test_get_job_rejects_bad_query(client, query):
+    job_id = submit(client)
+    assert client.get(f"/api/jobs/{job_id}?{query}").status_code == 400
+
+
+def test_unknown_job_is_not_found(client):
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert client.delete("/api/jobs/missing").status_code == 404
+
+
+def test_submit_without_data_is_rejected(client):
+    assert client.post("/api/jobs/compute-routes", json={}).status_code == 400
+
+
+def test_running_job_stops_at_next_report():
+    manager = JobManager(workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def work(job):
+        job.report("first", 0.1)
+        started.set()
+        release.wait(5)
+        job.report("second", 0.5)
+        return "unreachable"
+
+    job = manager.submit(work)
+    assert started.wait(5)
+    manager.cancel(job.id)
+    # The stage in progress is not interrupted
+    assert not job.finished
+    release.set()
+    for _ in range(10):
+        if job.finished:
+            break
+        manager.wait(job, job.version, 5)
+    assert job.status == CANCELLED
+    assert job.result is None
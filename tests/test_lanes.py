@@ -0,0 +1,69 @@
+import copy
+
+import numpy as np
+import pytest
+
+from Backend.Solver.calculation import (assign_transport_by_lane_from_instance, assign_transport_from_instance,
+                                        solve_instance)
+from Backend.Solver.instance import ProblemInstance
+from Backend.Solver.lanes import Lanes
+
+
+def random_instance(seed, transports):
+    rng = np.random.default_rng(seed)
+    products = ["A", "B", "C"]
+
+    def nodes(prefix, count):
+        return [{"name": f"{prefix}{k + 1}", "address": f"{prefix}{k + 1} address",
+                 "cargos": [{"type": p, "weight": str(1 + j), "quantity": int(rng.integers(1, 40))}
+                            for j, p in enumerate(products)]}
+                for k in range(count)]
+
+    warehouses, receivers = nodes("W", 3), nodes("D", 4)
+    routes = [{"from": w["name"], "from_address": w["address"], "to": d["name"], "to_address": d["address"],
+               "distance_m": int(rng.integers(10, 500)), "path": []}
+              for w in warehouses for d in receivers]
+    return ProblemInstance.from_json(warehouses, receivers, routes, transports)
+
+
+def test_consolidate_sums_weight_per_lane():
+    lanes = Lanes.consolidate([0, 1, 0, 1], [2, 3, 2, 2], [5, 7, 5, 9], [1, 2, 3, 0], 4)
+    assert lanes.lanes[0] == lanes.lanes[2]
+    assert len(set(lanes.lanes.tolist())) == 3
+    assert lanes.lengths[lanes.lanes].tolist() == [5, 7, 5, 9]
+    assert lanes.weights[lanes.lanes].tolist() == [4, 2, 4, 0]
+    assert lanes.shares.tolist() == [0.25, 1.0, 0.75, 1.0]
+
+
+def test_consolidate_splits_lane_without_weight_equally():
+    lanes = Lanes.consolidate([0, 0], [1, 1], [3, 3], [0, 0], 2)
+    assert lanes.shares.tolist() == [0.5, 0.5]
+
+
+def test_spread_choice_charges_the_whole_lane_cost():
+    lanes = Lanes.consolidate([0, 1, 0], [2, 2, 2], [5, 7, 5], [1, 2, 3], 3)
+    loads, units, costs, unassigned = lanes.spread_choice(np.array([1, -1]), np.array([8.0, 0.0]))
+    assert units.tolist() == [1, -1, 1]
+    assert costs.sum() == pytest.approx(8.0)
+    assert unassigned.tolist() == [0, 2, 0]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_consolidated_cost_never_exceeds_per_product_cost(seed):
+    # With one transport type a lane needs at most as many trips as its products sized apart
+    instance = random_instance(seed, [{"name": "T", "capacity": "25", "fuel": "2"}])
+    calculations = solve_instance(instance, 1.0, "simplex")
+    per_product = copy.deepcopy(calculations)
+    for calculation in per_product:
+        assign_transport_from_instance(instance, calculation)
+    assign_transport_by_lane_from_instance(instance, calculations)
+    consolidated = sum(c.cost_overall for c in calculations)
+    assert 0 < consolidated <= sum(c.cost_overall for c in per_product) + 1e-9
+
+
+def test_per_product_cost_charges_every_route():
+    instance = random_instance(0, [{"name": "T", "capacity": "25", "fuel": "2"}])
+    [calculation, *_] = solve_instance(instance, 1.0, "simplex")
+    chosen, costs = instance.fleet.assign(instance.route_lengths[calculation.routes], calculation.amounts)
+    assign_transport_from_instance(instance, calculation)
+    assert calculation.cost_overall == pytest.approx(costs[chosen >= 0].sum())
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from Backend.Solver import calculation
+from Backend.Solver.plan_cache import PlanCache
+
+SUPPLY, DEMAND, COST = [5, 5], [4, 6], [[1, 2], [3, 1]]
+
+
+def plan(value, size=4):
+    return np.full(size, value, dtype=np.int64)
+
+
+def test_miss_then_hit():
+    cache = PlanCache(1024)
+    key = PlanCache.key("simplex", SUPPLY, DEMAND, COST)
+    assert cache.get(key) is None
+    cache.put(key, plan(1))
+    assert cache.get(key).tolist() == [1, 1, 1, 1]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_key_depends_on_engine_and_content():
+    key = PlanCache.key("simplex", SUPPLY, DEMAND, COST)
+    assert key == PlanCache.key("simplex", np.array(SUPPLY, dtype=np.int32), DEMAND, np.array(COST))
+    assert key != PlanCache.key("numpy", SUPPLY, DEMAND, COST)
+    assert key != PlanCache.key("simplex", SUPPLY, DEMAND, [[1, 2], [3, 2]])
+    # The same eleven ones read as a 2 x 3 and as a 1 x 5 problem
+    assert PlanCache.key("simplex", [1] * 2, [1] * 3, [1] * 6) != PlanCache.key("simplex", [1], [1] * 5, [1] * 5)
+
+
+def test_entries_are_read_only_copies():
+    cache = PlanCache(1024)
+    source = plan(1)
+    stored = cache.put("a", source)
+    source[0] = 7
+    assert stored[0] == 1
+    with pytest.raises(ValueError):
+        stored[0] = 2
+
+
+def test_least_recently_used_goes_first_by_bytes():
+    # Three 32-byte plans fit in 100 bytes, a fourth evicts the least recently used
+    cache = PlanCache(100)
+    for key in "abc":
+        cache.put(key, plan(ord(key)))
+    cache.get("a")
+    cache.put("d", plan(4))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.bytes == 96
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_entry_keeps_byte_count():
+    cache = PlanCache(100)
+    cache.put("a", plan(1))
+    cache.put("a", plan(2, size=2))
+    assert cache.bytes == 16 and len(cache) == 1
+
+
+def test_plan_larger_than_budget_is_not_stored():
+    cache = PlanCache(16)
+    assert cache.put("a", plan(1)).tolist() == [1, 1, 1, 1]
+    assert len(cache) == 0
+
+
+def test_solve_reuses_cached_plan(monkeypatch):
+    calls = []
+
+    def engine(supply, demand, cost, out=None):
+        calls.append(1)
+        return calculation.ENGINES["simplex"](supply, demand, cost, out=out)
+
+    monkeypatch.setattr(calculation, "plan_cache", PlanCache(1024))
+    monkeypatch.setitem(calculation.ENGINES, "counting", engine)
+    first = calculation.solve(SUPPLY, DEMAND, COST, engine="counting")
+    second = calculation.solve(SUPPLY, DEMAND, COST, engine="counting")
+    [batched] = calculation.solve_batch([(SUPPLY, DEMAND, COST)], engine="counting")
+    assert len(calls) == 1
+    assert second is first and batched is first
+    assert not first.flags.writeable
@@ -0,0 +1,112 @@
+import os
+import threading
+
+import pytest
+from psycopg2 import extensions
+
+from Data import Data
+from Data.Data import ConnectionPool, PoolTimeout
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.info = FakeInfo()
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(Data.psycopg2, "connect", connect)
+    return opened
+
+
+def test_returned_connection_is_reused(connections):
+    pool = ConnectionPool(min_size=1, max_size=2)
+    conn = pool.getconn()
+    assert conn is connections[0] and not conn.autocommit
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()["connects"] == 1
+
+
+def test_pool_grows_up_to_max_size(connections):
+    pool = ConnectionPool(min_size=0, max_size=2)
+    first, second = pool.getconn(), pool.getconn()
+    assert first is not second
+    assert pool.stats()["in_use"] == 2
+
+
+def test_putconn_rolls_back_open_transaction(connections):
+    pool = ConnectionPool(min_size=1, max_size=1)
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_putconn_with_close_replaces_connection(connections):
+    pool = ConnectionPool(min_size=1, max_size=1)
+    conn = pool.getconn()
+    pool.putconn(conn, close=True)
+    assert conn.closed
+    assert pool.getconn() is not conn
+    assert pool.stats()["discarded"] == 1
+
+
+def test_getconn_times_out_when_exhausted(connections):
+    pool = ConnectionPool(min_size=1, max_size=1, timeout=0.05)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["waits"] >= 1
+
+
+def test_getconn_waits_for_a_returned_connection(connections):
+    pool = ConnectionPool(min_size=1, max_size=1, timeout=5)
+    conn = pool.getconn()
+    timer = threading.Timer(0.05, pool.putconn, (conn,))
+    timer.start()
+    assert pool.getconn() is conn
+    timer.join()
+
+
+def test_child_forgets_inherited_pools_without_closing_them(connections, monkeypatch):
+    monkeypatch.setattr(Data, "_pools", {})
+    pool = Data.get_pool(dbname="db")
+    Data._forget_pools()
+    assert Data._pools == {}
+    assert not connections[0].closed
+    assert Data.get_pool(dbname="db") is not pool
+    pool.closeall()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_starts_without_pools(connections, monkeypatch):
+    monkeypatch.setattr(Data, "_pools", {})
+    Data.get_pool(dbname="db")
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if not Data._pools and not connections[0].closed else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert len(Data._pools) == 1
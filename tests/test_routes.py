@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from Backend.Solver import Formaters
+from Backend.Solver.ClassBuilder import build_ProductStorage_from_json, build_Route_from_json, build_Transport_from_json
+from Backend.Solver.RouteClasses import DistanceMatrix, NO_ROUTE_COST_LIMIT, prohibit_missing_routes
+from Backend.Solver.calculation import solve_instance
+from Backend.Solver.instance import ProblemInstance
+
+TRANSPORTS = [{"name": "T", "capacity": "100", "fuel": "1"}]
+
+
+def cargo(quantity):
+    return [{"type": "A", "weight": "1", "quantity": quantity}]
+
+
+def route(source, target, distance=100):
+    return {"from": source, "from_address": f"{source} address", "to": target, "to_address": f"{target} address",
+            "distance_m": distance, "path": []}
+
+
+def nodes(prefix, quantities):
+    return [{"name": f"{prefix}{k + 1}", "address": f"{prefix}{k + 1} address", "cargos": cargo(q)}
+            for k, q in enumerate(quantities)]
+
+
+def legacy_statistics(warehouses, receivers, routes, engine, consolidate=False):
+    storages = build_ProductStorage_from_json(warehouses)
+    receiver_storages = build_ProductStorage_from_json(receivers)
+    built = build_Route_from_json(routes, storages + receiver_storages)
+    transports = build_Transport_from_json(TRANSPORTS)
+    result = Formaters.array_simple_formatter(storages, built, transports, 0, 1.0, engine=engine, consolidate=consolidate)
+    return [statistics for statistics, _ in result]
+
+
+def instance_statistics(warehouses, receivers, routes, engine, consolidate=False):
+    instance = ProblemInstance.from_json(warehouses, receivers, routes, TRANSPORTS)
+    result = Formaters.instance_simple_formatter(instance, 0, 1.0, engine=engine, consolidate=consolidate)
+    return [statistics for statistics, _ in result]
+
+
+def test_prohibit_missing_routes_prices_above_any_routed_plan():
+    cost = np.array([[5, -1], [7, 3]])
+    routed = cost >= 0
+    priced = prohibit_missing_routes(cost, routed)
+    assert priced[0, 1] > 2 * 7
+    assert (priced[routed] == cost[routed]).all()
+    assert prohibit_missing_routes(np.array([[2 ** 40, -1]]), np.array([[True, False]]))[0, 1] == NO_ROUTE_COST_LIMIT
+
+
+def test_distance_matrix_marks_pairs_without_route():
+    warehouses, receivers = nodes("W", [10, 10]), nodes("D", [10, 10])
+    storages = build_ProductStorage_from_json(warehouses)
+    routes = build_Route_from_json([route("W1", "D1"), route("W2", "D2")],
+                                   storages + build_ProductStorage_from_json(receivers))
+    distances = DistanceMatrix.from_routes(routes)
+    assert distances.routed.sum() == 2
+
+
+@pytest.mark.parametrize("engine", ["numpy", "simplex"])
+@pytest.mark.parametrize("statistics", [legacy_statistics, instance_statistics])
+def test_feasible_problem_avoids_cells_without_route(engine, statistics):
+    # W2 -> D2 has no route, the only full plan sends W1 to D2 and W2 to D1
+    warehouses, receivers = nodes("W", [10, 10]), nodes("D", [10, 10])
+    routes = [route("W1", "D1"), route("W1", "D2"), route("W2", "D1")]
+    [result] = statistics(warehouses, receivers, routes, engine)
+    assert result["undelivered_weight"] == 0
+    assert result["length"] == 200
+
+
+@pytest.mark.parametrize("engine", ["numpy", "simplex"])
+@pytest.mark.parametrize("statistics", [legacy_statistics, instance_statistics])
+def test_cargo_without_route_is_reported_undelivered(engine, statistics):
+    # D2 can only be reached from W1, which holds 5 of the 10 it needs
+    warehouses, receivers = nodes("W", [5, 15]), nodes("D", [10, 10])
+    routes = [route("W1", "D1"), route("W1", "D2"), route("W2", "D1")]
+    [result] = statistics(warehouses, receivers, routes, engine)
+    assert result["undelivered_weight"] == 5
+
+
+def test_instance_plan_carries_nothing_without_route():
+    warehouses, receivers = nodes("W", [5, 15]), nodes("D", [10, 10])
+    instance = ProblemInstance.from_json(warehouses, receivers, [route("W1", "D1"), route("W1", "D2"), route("W2", "D1")],
+                                         TRANSPORTS)
+    [calculation] = solve_instance(instance, 1.0, "simplex")
+    assert (calculation.routes >= 0).all()
+    assert calculation.undelivered_weight == 5
+
+
+@pytest.mark.parametrize("statistics", [legacy_statistics, instance_statistics])
+def test_consolidation_changes_nothing_on_a_single_lane(statistics):
+    # 250 on a lane of capacity 100 takes three trips either way
+    warehouses, receivers = nodes("W", [250]), nodes("D", [250])
+    routes = [route("W1", "D1")]
+    [apart] = statistics(warehouses, receivers, routes, "simplex")
+    [together] = statistics(warehouses, receivers, routes, "simplex", consolidate=True)
+    assert apart == together
+    assert apart["cost"] == pytest.approx(300)
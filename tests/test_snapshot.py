@@ -0,0 +1,71 @@
+import re
+
+from Data.Data import DatabaseManager, LogisticsSnapshot
+
+ROW = {
+    "products": [{"product_id": 1, "name": "A", "weight": 2.0}],
+    "warehouses": [{"warehouse_id": 3, "name": "W1", "address": "a1", "lat": 55.0, "lon": 37.0,
+                    "inventory": [{"product_name": "A", "quantity": 10}]}],
+    "transports": [{"name": "T", "capacity": 100.0, "fuel": 1.0}],
+    "collection_points": [],
+}
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchone(self):
+        return ROW
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    closed = 0
+
+    def __init__(self):
+        self.cursors = []
+
+    def cursor(self, cursor_factory=None):
+        self.cursors.append(RecordingCursor())
+        return self.cursors[-1]
+
+    def commit(self):
+        pass
+
+
+class SinglePool:
+    def __init__(self):
+        self.conn = RecordingConnection()
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+def test_snapshot_is_one_query():
+    pool = SinglePool()
+    with DatabaseManager("db", "user", "password", pool=pool) as db:
+        snapshot = db.get_logistics_snapshot(7)
+    [(query, params)] = pool.conn.cursors[0].executed
+    assert params == {"user_id": 7}
+    assert snapshot == LogisticsSnapshot(**ROW)
+
+
+def test_snapshot_filters_every_table_by_user():
+    pool = SinglePool()
+    with DatabaseManager("db", "user", "password", pool=pool) as db:
+        db.get_logistics_snapshot(7)
+    [(query, _)] = pool.conn.cursors[0].executed
+    for alias in ("p", "wh", "t", "cp"):
+        assert re.search(rf"WHERE {alias}\.user_id = %\(user_id\)s", query), alias
+    # Empty sets come back as [] rather than NULL, warehouses without inventory as well
+    assert query.count("'[]'::json") == 5
+    assert "LEFT JOIN storage_inventory" in query and "FILTER (WHERE p.product_id IS NOT NULL)" in query
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from Data.task_store import MemoryTaskStore, SQLiteTaskStore, TaskStore, make_task_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store_factory(request, tmp_path):
+    def factory(max_entries=1024, ttl=86400.0):
+        if request.param == "memory":
+            return MemoryTaskStore(max_entries, ttl)
+        return SQLiteTaskStore(str(tmp_path / "tasks.db"), max_entries, ttl)
+    return factory
+
+
+def test_task_store_is_abstract():
+    with pytest.raises(TypeError):
+        TaskStore()
+
+    class Incomplete(TaskStore):
+        def _load(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_make_task_store_rejects_unknown_spec():
+    with pytest.raises(ValueError):
+        make_task_store("redis://localhost")
+    assert isinstance(make_task_store("memory"), MemoryTaskStore)
+
+
+def test_states_are_not_shared(store_factory):
+    store = store_factory()
+    state = {"trucks": []}
+    store.set("a", state)
+    state["trucks"].append("T")
+    loaded = store.get("a")
+    loaded["warehouses"] = []
+    assert store.get("a") == {"trucks": []}
+    assert store.get("missing") is None
+
+
+def test_update_merges_fields(store_factory):
+    store = store_factory()
+    assert store.update("a", trucks=[1]) == {"trucks": [1]}
+    assert store.update("a", warehouses=[2]) == {"trucks": [1], "warehouses": [2]}
+    store.delete("a")
+    assert store.get("a") is None
+
+
+def test_least_recently_used_entries_are_dropped(store_factory):
+    store = store_factory(max_entries=2)
+    # SQLite orders by access time, which must not tie on a coarse clock
+    for step in (lambda: store.set("a", {}), lambda: store.set("b", {}), lambda: store.get("a"), lambda: store.set("c", {})):
+        step()
+        time.sleep(0.02)
+    assert store.get("b") is None
+    assert store.get("a") == {} and store.get("c") == {}
+    assert store.stats()["entries"] == 2
+
+
+def test_expired_entries_are_gone(store_factory):
+    store = store_factory(ttl=0.0)
+    store.set("a", {"x": 1})
+    assert store.get("a") is None
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from Backend.Solver import calculation, network_simplex
+from Backend.Solver.warm_start import BasisStore
+from tests.test_engines import check_plan, plan_cost
+
+
+def perturbed_problems(seed, count=30):
+    """Pairs of problems with the same cost matrix and different quantities."""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        rows, cols = rng.integers(1, 7, 2)
+        cost = rng.integers(1, 50, (rows, cols))
+        first = (rng.integers(0, 20, rows), rng.integers(0, 20, cols))
+        second = (rng.integers(0, 20, rows), rng.integers(0, 20, cols))
+        yield cost, first, second
+
+
+def test_store_key_follows_cost():
+    cost = np.array([[1, 2], [3, 4]])
+    key = BasisStore.key("A", cost)
+    assert key == BasisStore.key("A", cost.astype(np.int32))
+    assert key != BasisStore.key("B", cost)
+    assert key != BasisStore.key("A", cost.T)
+
+
+def test_store_drops_least_recently_used():
+    store = BasisStore(2)
+    store.put("a", np.zeros(1))
+    store.put("b", np.zeros(1))
+    store.get("a")
+    store.put("c", np.zeros(1))
+    assert store.get("b") is None
+    assert store.get("a") is not None and len(store) == 2
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_warm_start_reaches_the_cold_optimum(seed):
+    for cost, (supply, demand), (new_supply, new_demand) in perturbed_problems(seed):
+        _, basis = network_simplex.solve_with_basis(supply, demand, cost)
+        warm, _ = network_simplex.solve_with_basis(new_supply, new_demand, cost, basis)
+        check_plan(warm, new_supply, new_demand)
+        assert plan_cost(warm, cost) == plan_cost(network_simplex.solve(new_supply, new_demand, cost), cost)
+
+
+def test_unusable_basis_falls_back_to_a_cold_start():
+    supply, demand, cost = np.array([5, 5]), np.array([4, 6]), np.array([[1, 2], [3, 1]])
+    for basis in (np.array([[7, 7]]), np.array([[0, 1], [1, 0], [0, 0]])):
+        plan, _ = network_simplex.solve_with_basis(supply, demand, cost, basis)
+        check_plan(plan, supply, demand)
+        assert plan_cost(plan, cost) == plan_cost(network_simplex.solve(supply, demand, cost), cost)
+
+
+def test_warm_solver_keeps_a_basis_per_product_and_cost(monkeypatch):
+    store = BasisStore(16)
+    monkeypatch.setattr(calculation, "basis_store", store)
+    cost = np.array([[1, 2], [3, 1]])
+    problems = [(np.array([5, 5]), np.array([4, 6]), cost), (np.array([6, 4]), np.array([5, 5]), cost)]
+    for supply, demand, _ in problems:
+        plan = calculation.warm_solver("simplex", "A")(supply, demand, cost)
+        check_plan(plan, supply, demand)
+    assert len(store) == 1
+    calculation.solve_batch(problems, engine="simplex", keys=["A", "B"])
+    assert len(store) == 2